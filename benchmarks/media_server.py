@@ -0,0 +1,90 @@
+"""Local HTTP server serving synthetic media files of any size at a throttled rate
+
+GET /media/<name>?size=BYTES&rate=BYTES_PER_SECOND returns `size` bytes of filler
+(rate 0 = unthrottled). Range requests are honoured so .part resumes can be measured.
+"""
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CHUNK_SIZE = 16 * 1024
+FILLER = bytes(range(256)) * (CHUNK_SIZE // 256)
+RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def do_HEAD(self):
+        self.serve(body=False)
+    
+    def do_GET(self):
+        self.serve(body=True)
+    
+    def serve(self, body):
+        url = urlparse(self.path)
+        if not url.path.startswith("/media/"):
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        size = int(query.get('size', ['1048576'])[0])
+        rate = int(query.get('rate', ['0'])[0])
+        
+        start, end = 0, size - 1
+        match = RANGE_RE.match(self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            if start >= size:
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if not body:
+            return
+        
+        remaining = end - start + 1
+        started = time.monotonic()
+        sent = 0
+        try:
+            while remaining > 0:
+                chunk = FILLER[:min(CHUNK_SIZE, remaining)]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                remaining -= len(chunk)
+                if rate:
+                    # Sleep until the bytes sent so far are within the rate
+                    ahead = sent / rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client cancelled the download
+    
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+def start_server(host="127.0.0.1", port=0):
+    """Start the server on a background thread; returns (server, base URL)"""
+    server = ThreadingHTTPServer((host, port), MediaHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="media-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    server, base_url = start_server(port=8765)
+    print(f"Serving synthetic media at {base_url}/media/<name>?size=BYTES&rate=BPS (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,213 @@
+"""Offline benchmarks for the download engine (no network access, no real yt-dlp)
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --playlists 1,100 --size 256K --rate 2M --json results.json
+
+Measures output parser throughput, metadata extraction (cold and cached), and for each
+playlist size the end-to-end throughput, the rate of UI updates the engine produces and
+peak memory. Downloads go through benchmarks/stub_ytdlp.py and benchmarks/media_server.py.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from downloader_backends import PROGRESS_MARKER, ProgressEvent, SubprocessBackend, format_bytes
+from downloader_bandwidth import parse_rate
+from downloader_cache import MetadataCache
+from downloader_engine import DownloadEngine, DownloadJob, DownloadOptions
+from downloader_telemetry import Telemetry
+from media_server import start_server
+
+# Same as downloader_gui.UI_REFRESH_MS (not imported: that module needs customtkinter)
+UI_REFRESH_MS = 33
+
+
+def install_stub(folder):
+    """Put a `yt-dlp` executable that runs the stub first on the PATH"""
+    if os.name == 'nt':
+        raise SystemExit("The end-to-end benchmarks need a POSIX system (the stub is started as 'yt-dlp')")
+    path = os.path.join(folder, "yt-dlp")
+    with open(path, 'w') as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(BENCH_DIR, "stub_ytdlp.py")}" "$@"\n')
+    os.chmod(path, 0o755)
+    os.environ['PATH'] = folder + os.pathsep + os.environ.get('PATH', '')
+
+
+def max_rss():
+    """Peak resident memory of this process in bytes, when the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def sample_output(count):
+    """yt-dlp output as the engine sees it: mostly progress lines, some plain and informational ones"""
+    progress = {'status': 'downloading', 'downloaded_bytes': 5242880, 'total_bytes': 10485760,
+                'speed': 1048576.0, 'eta': 5, 'filename': '/tmp/out/video.mp4',
+                'tmpfilename': '/tmp/out/video.mp4.part', 'fragment_index': 12, 'fragment_count': 40}
+    kinds = [
+        f"{PROGRESS_MARKER} download {json.dumps(progress)}",
+        "[download]  42.1% of ~ 10.50MiB at  1.20MiB/s ETA 00:07 (frag 3/40)",
+        f"{PROGRESS_MARKER} download {json.dumps(dict(progress, downloaded_bytes=7340032))}",
+        "[youtube] dQw4w9WgXcQ: Downloading webpage",
+        f"{PROGRESS_MARKER} download {json.dumps(dict(progress, downloaded_bytes=9437184))}",
+        "[download] Destination: /tmp/out/video.mp4",
+        f"{PROGRESS_MARKER} postprocess {json.dumps({'status': 'started', 'postprocessor': 'Merger'})}",
+        "[info] dQw4w9WgXcQ: Downloading 1 format(s): 18",
+        f"{PROGRESS_MARKER} download {json.dumps(dict(progress, status='finished'))}",
+        "WARNING: [youtube] Falling back to generic n function search",
+    ]
+    return [kinds[i % len(kinds)] for i in range(count)]
+
+
+class UiMeter:
+    """Counts engine callbacks and the redraws the GUI would make from them"""
+    def __init__(self):
+        self.log_lines = 0
+        self.job_updates = 0
+        self.frames = set()  # UI ticks with at least one pending job update
+    
+    def log(self, message):
+        self.log_lines += 1
+    
+    def jobs(self, scheduler):
+        self.job_updates += 1
+        self.frames.add(int(time.monotonic() * 1000 // UI_REFRESH_MS))
+
+
+def bench_parser(lines, workdir):
+    engine = DownloadEngine(backend=SubprocessBackend(), metadata_cache=MetadataCache(os.path.join(workdir, "parser.json")),
+                            telemetry=Telemetry(os.path.join(workdir, "telemetry")))
+    job = DownloadJob(1, {'id': 'dQw4w9WgXcQ', 'title': 'Parser benchmark'}, os.path.join(workdir, '%(title)s.%(ext)s'))
+    output = sample_output(lines)
+    started = time.perf_counter()
+    for line in output:
+        if ProgressEvent.from_line(line) is None:
+            engine.parse_progress(line, job)
+    elapsed = time.perf_counter() - started
+    return {'lines': lines, 'seconds': elapsed, 'lines_per_second': lines / elapsed}
+
+
+def bench_metadata(workdir):
+    """get_video_info through the stub (cold) and then from the metadata cache (warm)"""
+    engine = DownloadEngine(backend=SubprocessBackend(), metadata_cache=MetadataCache(os.path.join(workdir, "meta.json")),
+                            telemetry=Telemetry(os.path.join(workdir, "telemetry")))
+    url = "https://www.youtube.com/watch?v=bench000001"
+    timings = {}
+    for label in ('cold', 'warm'):
+        started = time.perf_counter()
+        engine.get_video_info(url)
+        timings[f"{label}_seconds"] = time.perf_counter() - started
+    return timings
+
+
+def bench_playlist(entries, args, workdir):
+    meter = UiMeter()
+    output = tempfile.mkdtemp(prefix=f"playlist-{entries}-", dir=workdir)
+    engine = DownloadEngine(
+        backend=SubprocessBackend(),
+        metadata_cache=MetadataCache(os.path.join(workdir, f"playlist-{entries}.json")),
+        on_log=meter.log,
+        on_jobs=meter.jobs,
+        telemetry=Telemetry(os.path.join(workdir, "telemetry"))
+    )
+    options = DownloadOptions(False, "360p", args.fragments)
+    if args.memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    summary = engine.download([f"https://www.youtube.com/playlist?list=bench-{entries}"], output, options,
+                              playlist=True, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    peak = None
+    if args.memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    engine.close()
+    shutil.rmtree(output, ignore_errors=True)
+    
+    downloaded = summary.completed * args.size
+    return {
+        'entries': entries,
+        'completed': summary.completed,
+        'failed': summary.failed,
+        'seconds': elapsed,
+        'videos_per_second': summary.completed / elapsed,
+        'bytes_per_second': downloaded / elapsed,
+        'job_updates_per_second': meter.job_updates / elapsed,
+        'ui_redraws_per_second': len(meter.frames) / elapsed,
+        'log_lines': meter.log_lines,
+        'peak_python_bytes': peak,
+        'max_rss_bytes': max_rss(),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for Arijit's YT Video Downloader")
+    parser.add_argument("--playlists", default="1,100,1000", help="playlist sizes to download (default: 1,100,1000)")
+    parser.add_argument("--size", default="256K", help="bytes per synthetic video (default: 256K)")
+    parser.add_argument("--rate", default="0", help="server-side rate per download, e.g. 2M (default: unthrottled)")
+    parser.add_argument("-w", "--workers", type=int, default=3, help="parallel downloads (default: 3)")
+    parser.add_argument("-N", "--fragments", default="1", help="fragments per video, or 'auto' (default: 1)")
+    parser.add_argument("--parser-lines", type=int, default=200000, help="lines for the parser benchmark")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip tracemalloc (it slows the playlist runs down)")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.size = parse_rate(args.size)  # Same K/M/G suffixes as a rate
+    rate = parse_rate(args.rate)
+    
+    workdir = tempfile.mkdtemp(prefix="ytdl-bench-")
+    os.makedirs(os.path.join(workdir, "bin"))
+    install_stub(os.path.join(workdir, "bin"))
+    server, base_url = start_server()
+    os.environ.update(YTDL_BENCH_SERVER=base_url, YTDL_BENCH_SIZE=str(args.size), YTDL_BENCH_RATE=str(rate))
+    
+    results = {'size': args.size, 'rate': rate, 'workers': args.workers}
+    try:
+        results['parser'] = parser_result = bench_parser(args.parser_lines, workdir)
+        print(f"Parser: {parser_result['lines_per_second']:,.0f} lines/s ({parser_result['lines']:,} lines)")
+        
+        results['metadata'] = metadata = bench_metadata(workdir)
+        print(f"get_video_info: {metadata['cold_seconds'] * 1000:.1f} ms cold, "
+              f"{metadata['warm_seconds'] * 1000:.2f} ms cached")
+        
+        results['playlists'] = []
+        print(f"\n{'entries':>8} {'seconds':>9} {'videos/s':>9} {'throughput':>12} {'updates/s':>10} "
+              f"{'redraws/s':>10} {'peak heap':>10} {'max RSS':>10}")
+        for entries in (int(value) for value in args.playlists.split(',') if value.strip()):
+            result = bench_playlist(entries, args, workdir)
+            results['playlists'].append(result)
+            peak = format_bytes(result['peak_python_bytes']) if result['peak_python_bytes'] is not None else "-"
+            rss = format_bytes(result['max_rss_bytes']) if result['max_rss_bytes'] is not None else "-"
+            print(f"{entries:>8} {result['seconds']:>9.2f} {result['videos_per_second']:>9.1f} "
+                  f"{format_bytes(result['bytes_per_second']) + '/s':>12} {result['job_updates_per_second']:>10.0f} "
+                  f"{result['ui_redraws_per_second']:>10.1f} {peak:>10} {rss:>10}")
+            if result['failed']:
+                print(f"         ⚠️ {result['failed']} download(s) failed")
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
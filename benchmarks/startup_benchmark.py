@@ -0,0 +1,135 @@
+"""Start-up benchmark: time until the window is interactive, plus what the headless paths pay
+
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 10 --check     # exit 1 when over the 300 ms target
+
+Each measurement starts a fresh interpreter, so it includes Python's own start-up. The window
+is timed from spawning the process to its first idle event loop pass (dependency checks run
+afterwards, in the background). It needs customtkinter and a display and is skipped otherwise.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from downloader_tools import ToolCache
+from run_benchmarks import install_stub
+
+TARGET_MS = 300
+
+GUI_CHILD = r'''
+import contextlib, io, json, sys, time
+started = float(sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+import youtube_downloader_pro
+with contextlib.redirect_stdout(io.StringIO()):
+    youtube_downloader_pro.check_and_install_requirements()
+from downloader_gui import YouTubeDownloader
+app = YouTubeDownloader()
+
+def interactive():
+    app.root.update_idletasks()
+    print(json.dumps({'interactive_ms': (time.time() - started) * 1000}), flush=True)
+    app.root.quit()
+
+app.root.after(0, interactive)
+app.run()
+'''
+
+
+def time_window(env):
+    """Milliseconds from spawn to an interactive window, or (None, reason)"""
+    started = time.time()
+    result = subprocess.run([sys.executable, '-c', GUI_CHILD, repr(started), REPO_DIR], capture_output=True, text=True,
+                            env=env, timeout=60)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)['interactive_ms'], None
+    errors = result.stderr.strip().splitlines()
+    return None, errors[-1] if errors else f"exit code {result.returncode}"
+
+
+def time_code(code, env):
+    """Milliseconds a fresh interpreter takes to run code"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, env=env, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def bench_tools(folder):
+    """yt-dlp lookup with an empty cache (spawns --version), then as a new process would see it"""
+    path = os.path.join(folder, "tools.json")
+    started = time.perf_counter()
+    ToolCache(path).find('yt-dlp')
+    cold = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    ToolCache(path).find('yt-dlp')
+    warm = (time.perf_counter() - started) * 1000
+    return {'cold_ms': cold, 'cached_ms': warm}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Start-up benchmark for Arijit's YT Video Downloader")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement (default: 5)")
+    parser.add_argument("--check", action="store_true", help=f"exit 1 when the window takes over {TARGET_MS} ms")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="ytdl-startup-")
+    os.makedirs(os.path.join(workdir, "bin"))
+    install_stub(os.path.join(workdir, "bin"))
+    # A private cache folder, warmed by the first run like a user's would be
+    env = dict(os.environ, XDG_CACHE_HOME=os.path.join(workdir, "cache"), LOCALAPPDATA=os.path.join(workdir, "cache"))
+    
+    results = {'runs': args.runs, 'target_ms': TARGET_MS}
+    try:
+        results['tools'] = tools = bench_tools(workdir)
+        print(f"yt-dlp discovery: {tools['cold_ms']:.1f} ms cold, {tools['cached_ms']:.2f} ms cached")
+        
+        for label, code in (('interpreter', 'pass'),
+                            ('engine', 'import downloader_engine; downloader_engine.DownloadEngine()'),
+                            ('cli', 'import downloader_cli')):
+            timings = [time_code(code, env) for _ in range(args.runs)]
+            results[label] = {'median_ms': statistics.median(timings), 'timings_ms': timings}
+            print(f"{label + ':':<13} {statistics.median(timings):7.1f} ms (median of {args.runs})")
+        
+        timings = []
+        reason = None
+        for _ in range(args.runs):
+            elapsed, reason = time_window(env)
+            if elapsed is None:
+                break
+            timings.append(elapsed)
+        if not timings:
+            results['window'] = {'skipped': reason}
+            print(f"{'window:':<13} skipped ({reason})")
+            over = False
+        else:
+            median = statistics.median(timings)
+            results['window'] = {'median_ms': median, 'timings_ms': timings}
+            over = median > TARGET_MS
+            print(f"{'window:':<13} {median:7.1f} ms (median of {len(timings)}) "
+                  f"{'❌ over' if over else '✅ under'} the {TARGET_MS} ms target")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if args.check and over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Stand-in for the yt-dlp command line, driven by the benchmark harness
+
+Understands the options the downloader passes (--version, --flat-playlist, --dump-json,
+-o, -f, --limit-rate, --playlist-start, --progress-template ...) and prints output shaped like yt-dlp's.
+Media is fetched from the local media server:
+
+    YTDL_BENCH_SERVER  base URL of benchmarks/media_server.py (required for downloads)
+    YTDL_BENCH_SIZE    bytes per video (default 1 MiB)
+    YTDL_BENCH_RATE    server-side rate per download in bytes/s (default 0 = unthrottled)
+
+Playlist URLs with list=bench-<N> have N entries.
+"""
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+VERSION = "2024.12.13"
+CHUNK_SIZE = 16 * 1024
+SIZE_RE = re.compile(r'^([\d.]+)\s*([KMG]?)', re.IGNORECASE)
+
+
+def option(args, *names, default=None):
+    for name in names:
+        if name in args:
+            return args[args.index(name) + 1]
+    return default
+
+
+def video_id_from_url(url):
+    query = parse_qs(urlparse(url).query)
+    return query.get('v', [url.rstrip('/').split('/')[-1]])[0]
+
+
+def entry_count(url):
+    playlist = parse_qs(urlparse(url).query).get('list', [''])[0]
+    return int(playlist.split('-')[-1]) if playlist.startswith('bench-') else 1
+
+
+def media_size():
+    return int(os.environ.get('YTDL_BENCH_SIZE', 1024 * 1024))
+
+
+def format_table(size):
+    """A realistic subset of YouTube's format list; the progressive 18 is the one served"""
+    return [
+        {'format_id': '139', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.5', 'abr': 48.8,
+         'filesize': size // 20, 'protocol': 'https'},
+        {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129.5,
+         'filesize': size // 8, 'protocol': 'https'},
+        {'format_id': '18', 'ext': 'mp4', 'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2', 'height': 360,
+         'width': 640, 'tbr': 500.0, 'filesize': size, 'protocol': 'https'},
+        {'format_id': '136', 'ext': 'mp4', 'vcodec': 'avc1.4d401f', 'acodec': 'none', 'height': 720,
+         'width': 1280, 'tbr': 1200.0, 'filesize': size * 3, 'protocol': 'https'},
+    ]
+
+
+def info_dict(video_id, index=None, count=None):
+    size = media_size()
+    info = {
+        'id': video_id,
+        'title': f"Benchmark video {video_id}",
+        'webpage_url': f"https://www.youtube.com/watch?v={video_id}",
+        'duration': 212,
+        'uploader': "Benchmark Channel",
+        'view_count': 123456,
+        'description': "Synthetic benchmark entry. " * 40,
+        'thumbnails': [{'url': f"https://i.ytimg.com/vi/{video_id}/{n}.jpg", 'id': str(n)} for n in range(10)],
+        'formats': format_table(size),
+        'ext': 'mp4',
+        'format_id': '18',
+    }
+    if index is not None:
+        info.update(playlist="Benchmark Playlist", playlist_id=f"bench-{count}", playlist_index=index,
+                    n_entries=count)
+    return info
+
+
+def parse_rate(value):
+    match = SIZE_RE.match(value or '')
+    if not match:
+        return 0
+    return int(float(match.group(1)) * {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[match.group(2).upper()])
+
+
+def flat_playlist(url, start=1):
+    count = entry_count(url)
+    for index in range(start, count + 1):
+        video_id = f"bench{index:06d}"
+        print(json.dumps({
+            '_type': 'url', 'ie_key': 'Youtube', 'id': video_id,
+            'url': f"https://www.youtube.com/watch?v={video_id}", 'title': f"Benchmark video {video_id}",
+            'duration': 212, 'playlist': "Benchmark Playlist", 'playlist_id': f"bench-{count}",
+            'playlist_index': index, 'n_entries': count,
+        }), flush=True)
+
+
+def download(args, url):
+    video_id = video_id_from_url(url)
+    templates = [template.split(':', 1)[1] for flag, template in zip(args, args[1:]) if flag == '--progress-template']
+    progress_template = next((template for template in templates if ' download ' in template), None)
+    output = option(args, '-o', default='%(title)s.%(ext)s')
+    filename = output.replace('%(title)s', f"Benchmark video {video_id}").replace('%(ext)s', 'mp4')
+    part_name = filename + '.part'
+    limit = parse_rate(option(args, '--limit-rate', '-r'))
+    
+    print(f"[youtube] Extracting URL: {url}")
+    print(f"[youtube] {video_id}: Downloading webpage")
+    print(f"[youtube] {video_id}: Downloading ios player API JSON")
+    print(f"[info] {video_id}: Downloading 1 format(s): 18")
+    if os.path.exists(filename):
+        print(f"[download] {filename} has already been downloaded", flush=True)
+        return 0
+    print(f"[download] Destination: {filename}", flush=True)
+    
+    size = media_size()
+    rate = os.environ.get('YTDL_BENCH_RATE', '0')
+    request = Request(f"{os.environ['YTDL_BENCH_SERVER']}/media/{video_id}.mp4?size={size}&rate={rate}")
+    resume_from = os.path.getsize(part_name) if os.path.exists(part_name) else 0
+    if resume_from:
+        request.add_header('Range', f"bytes={resume_from}-")
+    
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    started = time.monotonic()
+    downloaded = resume_from
+    with urlopen(request) as response, open(part_name, 'ab' if resume_from else 'wb') as f:
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            downloaded += len(chunk)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            if limit:
+                ahead = (downloaded - resume_from) / limit - elapsed
+                if ahead > 0:
+                    time.sleep(ahead)
+                    elapsed += ahead
+            speed = (downloaded - resume_from) / elapsed
+            progress = {
+                'status': 'downloading', 'downloaded_bytes': downloaded, 'total_bytes': size,
+                'tmpfilename': part_name, 'filename': filename, 'eta': int((size - downloaded) / speed) if speed else None,
+                'speed': speed, 'elapsed': elapsed, 'ctx_id': None,
+                '_percent_str': f"{downloaded * 100 / size:5.1f}%",
+            }
+            if progress_template:
+                print(progress_template.replace('%(progress)j', json.dumps(progress)), flush=True)
+            else:
+                print(f"[download] {downloaded * 100 / size:5.1f}% of {size / 1048576:.2f}MiB "
+                      f"at {speed / 1048576:.2f}MiB/s ETA 00:00", flush=True)
+    os.replace(part_name, filename)
+    elapsed = time.monotonic() - started
+    print(f"[download] 100% of {size / 1048576:.2f}MiB in {elapsed:.2f}s", flush=True)
+    return 0
+
+
+def main(args):
+    if '--version' in args:
+        print(VERSION)
+        return 0
+    url = args[-1]
+    if '--flat-playlist' in args:
+        flat_playlist(url, int(option(args, '--playlist-start', default=1)))
+        return 0
+    if '--dump-json' in args:
+        count = entry_count(url)
+        if count > 1:
+            for index in range(1, count + 1):
+                print(json.dumps(info_dict(f"bench{index:06d}", index, count)))
+        else:
+            print(json.dumps(info_dict(video_id_from_url(url))))
+        return 0
+    return download(args, url)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
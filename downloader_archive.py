@@ -0,0 +1,69 @@
+"""Per-folder index of finished downloads, checked before any job is scheduled"""
+import json
+import os
+import threading
+import time
+
+ARCHIVE_FILENAME = ".ytdl-archive.json"
+
+
+class DownloadArchive:
+    """Video ID -> format -> output path of everything already downloaded into a folder"""
+    def __init__(self, folder):
+        self.folder = os.path.abspath(folder)
+        self.path = os.path.join(self.folder, ARCHIVE_FILENAME)
+        self._records = None
+        self._lock = threading.Lock()
+    
+    def contains(self, video_id, format_key):
+        """True when video_id was downloaded with format_key and its file is still there"""
+        if not video_id:
+            return False
+        with self._lock:
+            self._load()
+            record = self._records.get(video_id, {}).get(format_key)
+        if record is None:
+            return False
+        # Re-download when the user deleted or moved the file
+        return not record.get('path') or os.path.exists(os.path.join(self.folder, record['path']))
+    
+    def add(self, video_id, format_key, path):
+        """Record a finished download and persist the index atomically"""
+        if not video_id:
+            return
+        with self._lock:
+            self._load()
+            self._records.setdefault(video_id, {})[format_key] = {'path': self._relative(path), 'completed': time.time()}
+            self._save()
+    
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._records)
+    
+    def _load(self):
+        if self._records is not None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._records = json.load(f).get('videos', {})
+        except (OSError, ValueError, AttributeError):
+            self._records = {}
+    
+    def _save(self):
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'videos': self._records}, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # Losing an archive entry only costs a re-check on the next run
+    
+    def _relative(self, path):
+        """path relative to the archive's folder, so lookups don't depend on the working directory"""
+        if not path:
+            return path
+        try:
+            return os.path.relpath(os.path.abspath(path), self.folder)
+        except ValueError:
+            return os.path.abspath(path)  # On another drive (Windows)
@@ -0,0 +1,528 @@
+"""yt-dlp backends (in-process API or command line) and the progress protocol they share"""
+import itertools
+import json
+import os
+import queue
+import re
+import selectors
+import signal
+import subprocess
+import threading
+
+from downloader_tools import find_tool, module_available
+from downloader_tuning import external_downloader_args
+
+
+# Progress lines emitted through --progress-template start with this marker
+PROGRESS_MARKER = "[ytdl-progress]"
+PROGRESS_TEMPLATES = [
+    f"download:{PROGRESS_MARKER} download %(progress)j",
+    f"postprocess:{PROGRESS_MARKER} postprocess %(progress)j",
+]
+
+# Fallback for plain yt-dlp progress lines, e.g.
+# "[download]  42.1% of ~ 10.50MiB at  1.20MiB/s ETA 00:07 (frag 3/40)"
+PROGRESS_LINE_RE = re.compile(
+    r'^\[download\]\s+(?P<percent>[\d.]+)%\s+of\s+~?\s*(?P<total>[\d.]+\s*[KMGT]?i?B)'
+    r'(?:\s+at\s+(?P<speed>[\d.]+\s*[KMGT]?i?B)/s)?'
+    r'(?:\s+ETA\s+(?P<eta>[\d:]+))?'
+    r'(?:\s+\(frag\s+(?P<frag>\d+)/(?P<frags>\d+)\))?'
+)
+SIZE_UNITS = {'B': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'TiB': 1024 ** 4,
+              'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4}
+
+
+def parse_size(text):
+    """Convert a yt-dlp size string such as '10.50MiB' to bytes"""
+    match = re.match(r'([\d.]+)\s*([KMGT]?i?B)', text or '')
+    if not match or match.group(2) not in SIZE_UNITS:
+        return None
+    return float(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def parse_eta(text):
+    """Convert an ETA such as '01:02:03' or '00:07' to seconds"""
+    seconds = 0
+    for part in (text or '').split(':'):
+        if not part.isdigit():
+            return None
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def format_bytes(count):
+    """Human readable byte count"""
+    if count is None:
+        return "?"
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(count) < 1024:
+            return f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} TiB"
+
+
+def format_eta(seconds):
+    """Human readable ETA (h:mm:ss or m:ss)"""
+    if seconds is None:
+        return "?"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+class ProgressEvent:
+    """Typed progress update for one job, from yt-dlp's progress dict"""
+    def __init__(self, phase="download", status="downloading", downloaded_bytes=None, total_bytes=None,
+                 speed=None, eta=None, fragment_index=None, fragment_count=None, filename=None, tmpfilename=None,
+                 percent=None):
+        self.phase = phase  # download or postprocess
+        self.status = status  # downloading, finished, error / started, processing (postprocess)
+        self.downloaded_bytes = downloaded_bytes
+        self.total_bytes = total_bytes
+        self.speed = speed  # bytes per second
+        self.eta = eta  # seconds
+        self.fragment_index = fragment_index
+        self.fragment_count = fragment_count
+        self.filename = filename
+        self.tmpfilename = tmpfilename  # The .part file while downloading
+        self._percent = percent
+    
+    @property
+    def percent(self):
+        """Completion of the current file in percent, if known"""
+        if self._percent is not None:
+            return self._percent
+        if self.status == 'finished' and self.phase == 'download':
+            return 100.0
+        if self.downloaded_bytes is not None and self.total_bytes:
+            return min(100.0, self.downloaded_bytes * 100.0 / self.total_bytes)
+        if self.fragment_index and self.fragment_count:
+            return min(100.0, self.fragment_index * 100.0 / self.fragment_count)
+        return None
+    
+    @classmethod
+    def from_progress_dict(cls, phase, progress):
+        """Build an event from a yt-dlp progress (or postprocessor) hook dict"""
+        return cls(
+            phase=phase,
+            status=progress.get('status'),
+            downloaded_bytes=progress.get('downloaded_bytes'),
+            total_bytes=progress.get('total_bytes') or progress.get('total_bytes_estimate'),
+            speed=progress.get('speed'),
+            eta=progress.get('eta'),
+            fragment_index=progress.get('fragment_index'),
+            fragment_count=progress.get('fragment_count'),
+            filename=progress.get('filename') or progress.get('postprocessor'),
+            tmpfilename=progress.get('tmpfilename'),
+        )
+    
+    @classmethod
+    def from_line(cls, line):
+        """Parse one line of yt-dlp output; returns None for non-progress lines"""
+        if line.startswith(PROGRESS_MARKER):
+            try:
+                _, phase, payload = line.split(' ', 2)
+                return cls.from_progress_dict(phase, json.loads(payload))
+            except (ValueError, AttributeError):
+                return None
+        match = PROGRESS_LINE_RE.match(line)
+        if match is None:
+            return None
+        frag, frags = match.group('frag'), match.group('frags')
+        return cls(
+            total_bytes=parse_size(match.group('total')),
+            speed=parse_size(match.group('speed')),
+            eta=parse_eta(match.group('eta')),
+            fragment_index=int(frag) if frag else None,
+            fragment_count=int(frags) if frags else None,
+            percent=float(match.group('percent')),
+        )
+
+
+class BackendError(Exception):
+    """Raised when yt-dlp cannot be run or fails to extract information"""
+
+
+# How often a job's output loop wakes up to check for stop / pause requests
+POLL_INTERVAL = 0.1
+TERMINATE_TIMEOUT = 3
+
+
+def spawn(cmd, merge_stderr=True):
+    """Start cmd in its own process group so the job can be signalled without touching other processes"""
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    return subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+        **kwargs
+    )
+
+
+def read_lines(process, timeout=POLL_INTERVAL):
+    """Yield decoded output lines without blocking; yields None whenever timeout passes without a line"""
+    if os.name == 'nt':
+        # Pipes can't be polled with select() on Windows, so a thread does the blocking reads
+        lines = queue.Queue()
+        
+        def pump():
+            for raw in process.stdout:
+                lines.put(raw)
+            lines.put(b'')
+        
+        threading.Thread(target=pump, daemon=True).start()
+        while True:
+            try:
+                raw = lines.get(timeout=timeout)
+            except queue.Empty:
+                if process.poll() is not None:
+                    return  # A leftover child may hold the pipe open after yt-dlp exited
+                yield None
+                continue
+            if not raw:
+                return
+            yield raw.decode('utf-8', errors='replace').rstrip('\r\n')
+    
+    fd = process.stdout.fileno()
+    os.set_blocking(fd, False)
+    buffer = b''
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while True:
+            if not selector.select(timeout):
+                if process.poll() is not None:
+                    break  # A leftover child may hold the pipe open after yt-dlp exited
+                yield None
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            buffer += chunk
+            *complete, buffer = buffer.split(b'\n')
+            for raw in complete:
+                yield raw.decode('utf-8', errors='replace').rstrip('\r')
+    if buffer:
+        yield buffer.decode('utf-8', errors='replace')
+
+
+def signal_process(process, sig):
+    """Send sig to the process group of a job (POSIX only)"""
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def terminate(process):
+    """Stop a job's process and its children (ffmpeg, aria2c), escalating to a kill"""
+    if process.poll() is not None:
+        if os.name != 'nt':
+            signal_process(process, signal.SIGTERM)  # Children left behind in the job's group
+        return
+    if os.name == 'nt':
+        # /T ends the whole tree of this one process, never other yt-dlp instances
+        subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)], capture_output=True, check=False)
+    else:
+        signal_process(process, signal.SIGTERM)
+        signal_process(process, signal.SIGCONT)  # A paused group only handles SIGTERM once continued
+    try:
+        process.wait(timeout=TERMINATE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        if os.name == 'nt':
+            process.kill()
+        else:
+            signal_process(process, signal.SIGKILL)
+        process.wait()
+
+
+class SubprocessBackend:
+    """Runs the yt-dlp command line tool for every call"""
+    name = "subprocess"
+    in_process = False  # Bandwidth can only be capped per process (job.rate_limit)
+    can_pause = os.name != 'nt'  # Pausing suspends the job's process group with SIGSTOP
+    
+    def version(self):
+        """Return the yt-dlp version string (cached until the executable changes)"""
+        found = find_tool('yt-dlp')
+        if found is None:
+            raise BackendError("yt-dlp is not available: not found on the PATH, or it failed to run")
+        return found[1]
+    
+    def extract_info(self, url):
+        """Return the full info dicts for a video or every entry of a playlist"""
+        cmd = ['yt-dlp', '--dump-json', '--no-download', url]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise BackendError(f"Error getting video info: {e}")
+        return [json.loads(line) for line in result.stdout.strip().split('\n') if line]
+    
+    def iter_flat_entries(self, url, should_continue, start=1):
+        """Yield playlist entries as yt-dlp enumerates them (flat extraction), from position start"""
+        cmd = ['yt-dlp', '--flat-playlist', '--dump-json']
+        if start > 1:
+            cmd += ['--playlist-start', str(start)]
+        cmd.append(url)
+        process = spawn(cmd, merge_stderr=False)
+        
+        # Drain stderr in the background so a chatty extractor can't block on a full pipe
+        errors = []
+        stderr_thread = threading.Thread(target=lambda: errors.extend(process.stderr), daemon=True)
+        stderr_thread.start()
+        
+        try:
+            for line in read_lines(process):
+                if not should_continue():
+                    return
+                if not line or not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        finally:
+            terminate(process)
+            stderr_thread.join(timeout=1)
+        
+        if process.returncode != 0:
+            message = errors[-1].decode('utf-8', errors='replace').strip() if errors else f"yt-dlp exited with code {process.returncode}"
+            raise BackendError(f"Error getting playlist entries: {message}")
+    
+    def build_command(self, job, options):
+        """Build the yt-dlp command line for a single job"""
+        cmd = ['yt-dlp', '-o', job.output_template]
+        cmd.extend(['-f', job.format_selector()])
+        if options.audio_only and not job.postprocess:
+            cmd.extend(['--extract-audio', '--audio-format', 'mp3', '--audio-quality', '0'])
+        elif job.format_plan is not None and job.format_plan.merged:
+            cmd.extend(['--merge-output-format', 'mp4'])
+        if job.rate_limit:
+            cmd.extend(['--limit-rate', str(job.rate_limit)])
+        if options.external_downloader:
+            args = ' '.join(external_downloader_args(options.external_downloader, job.fragments))
+            cmd.extend(['--downloader', options.external_downloader,
+                        '--downloader-args', f'{options.external_downloader}:{args}'])
+        elif job.fragments > 1:
+            cmd.extend(['--concurrent-fragments', str(job.fragments)])
+        cmd.extend(['--newline', '--no-playlist'])
+        for template in PROGRESS_TEMPLATES:
+            cmd.extend(['--progress-template', template])
+        cmd.append(job.url)
+        return cmd
+    
+    def download(self, job, options, on_output, on_progress, should_continue):
+        """Download one job; returns True on success"""
+        process = spawn(self.build_command(job, options))
+        job.process = process
+        suspended = False
+        try:
+            # Monitor progress; the loop wakes up at least every POLL_INTERVAL to check for stop / pause
+            for output in read_lines(process):
+                if not should_continue():
+                    break
+                if self.can_pause and job.paused != suspended:
+                    suspended = job.paused
+                    signal_process(process, signal.SIGSTOP if suspended else signal.SIGCONT)
+                if output is None:
+                    continue
+                output = output.strip()
+                event = ProgressEvent.from_line(output)
+                if event is not None:
+                    on_progress(event)
+                elif output:
+                    on_output(output)
+        finally:
+            terminate(process)
+            job.process = None
+        return process.returncode == 0 and should_continue()
+
+
+class _JobContext:
+    """The job a warmed YoutubeDL is working on; its hooks read this from any thread, fragment workers included"""
+    def __init__(self):
+        self.set()
+    
+    def set(self, job=None, on_output=None, on_progress=None, should_continue=None):
+        self.job = job
+        self.on_output = on_output
+        self.on_progress = on_progress
+        self.should_continue = should_continue
+
+
+class _YdlLogger:
+    """Forwards YoutubeDL messages to the output callback of the instance's current job"""
+    def __init__(self, context):
+        self.context = context
+    
+    def debug(self, message):
+        self._emit(message)
+    
+    def info(self, message):
+        self._emit(message)
+    
+    def warning(self, message):
+        self._emit(f"WARNING: {message}")
+    
+    def error(self, message):
+        self._emit(message if message.startswith("ERROR") else f"ERROR: {message}")
+    
+    def _emit(self, message):
+        on_output = self.context.on_output
+        if on_output:
+            on_output(message)
+
+
+class InProcessBackend:
+    """Drives yt-dlp's YoutubeDL API in this process, reusing warmed instances across jobs"""
+    name = "in-process"
+    in_process = True  # Progress hooks run inside the download (fragment threads too), so they can throttle it
+    can_pause = True  # The progress hook holds the downloading thread while its job is paused
+    
+    def __init__(self):
+        if not module_available('yt_dlp'):
+            raise ImportError("No module named 'yt_dlp'")
+        self._local = threading.local()  # Each download thread warms its own YoutubeDL instances
+    
+    @property
+    def yt_dlp(self):
+        # Imported on first use, so opening the window doesn't wait for it; paid once, every later
+        # job skips interpreter and extractor start-up
+        import yt_dlp
+        return yt_dlp
+    
+    def version(self):
+        """Return the yt-dlp version string"""
+        return self.yt_dlp.version.__version__
+    
+    def extract_info(self, url):
+        """Return the full info dicts for a video or every entry of a playlist"""
+        try:
+            ydl, _ = self._instance(('extract',), {'skip_download': True})
+            info = ydl.extract_info(url, download=False)
+        except Exception as e:
+            raise BackendError(f"Error getting video info: {e}")
+        if info is None:
+            raise BackendError("Error getting video info: no information returned")
+        if info.get('_type') == 'playlist':
+            return [entry for entry in info.get('entries') or [] if entry]
+        return [info]
+    
+    def iter_flat_entries(self, url, should_continue, start=1):
+        """Yield playlist entries as yt-dlp enumerates them (flat extraction), from position start"""
+        ydl, _ = self._instance(('flat',), {'extract_flat': 'in_playlist', 'skip_download': True})
+        try:
+            # process=False keeps the playlist's entries lazy, so pages are fetched as we iterate
+            info = ydl.extract_info(url, download=False, process=False)
+            # Unprocessed results may point elsewhere, e.g. a shared watch?v=…&list=… link to its playlist
+            while info.get('_type') in ('url', 'url_transparent'):
+                info = ydl.extract_info(info['url'], download=False, ie_key=info.get('ie_key'), process=False)
+            if info.get('_type') not in ('playlist', 'multi_video'):
+                yield info
+                return
+            entries = itertools.islice(info.get('entries') or [], start - 1, None)
+            for index, entry in enumerate(entries, start=start):
+                if not should_continue():
+                    return
+                if not entry:
+                    continue
+                entry = dict(entry)
+                entry.setdefault('playlist', info.get('title'))
+                entry.setdefault('playlist_id', info.get('id'))
+                entry.setdefault('playlist_index', index)
+                yield entry
+        except BackendError:
+            raise
+        except Exception as e:
+            raise BackendError(f"Error getting playlist entries: {e}")
+    
+    def build_params(self, options, extract_audio=True):
+        """YoutubeDL parameters equivalent to SubprocessBackend.build_command"""
+        params = {'format': options.format_selector(), 'noplaylist': True}
+        if options.audio_only and extract_audio:
+            params['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '0',
+            }]
+        return params
+    
+    def download(self, job, options, on_output, on_progress, should_continue):
+        """Download one job; returns True on success"""
+        extract_audio = not job.postprocess
+        key = ('download', options.audio_only, options.format_selector(), extract_audio)
+        ydl, context = self._instance(key, self.build_params(options, extract_audio))
+        ydl.params['outtmpl'] = {'default': job.output_template}
+        selector = job.format_selector()
+        if ydl.params.get('format') != selector:
+            # YoutubeDL compiles the selector once, in __init__; the job's plan needs it recompiled
+            ydl.params['format'] = selector
+            ydl.format_selector = ydl.build_format_selector(selector)
+        if job.format_plan is not None and job.format_plan.merged:
+            ydl.params['merge_output_format'] = 'mp4'
+        else:
+            ydl.params.pop('merge_output_format', None)
+        # Per-job network settings; the downloaders read them from params when each download starts
+        ydl.params['concurrent_fragment_downloads'] = job.fragments
+        if options.external_downloader:
+            ydl.params['external_downloader'] = {'default': options.external_downloader}
+            ydl.params['external_downloader_args'] = {
+                options.external_downloader: external_downloader_args(options.external_downloader, job.fragments)
+            }
+            # External downloaders bypass the progress hooks, so cap them directly
+            ydl.params['ratelimit'] = job.rate_limit or None
+        else:
+            ydl.params.pop('external_downloader', None)
+            ydl.params.pop('external_downloader_args', None)
+            ydl.params.pop('ratelimit', None)
+        # Bound to the instance, not the thread: with concurrent fragments yt-dlp calls the hooks from its own pool
+        context.set(job, on_output, on_progress, should_continue)
+        try:
+            ydl.extract_info(job.url, download=True)
+            return should_continue()
+        except Exception as e:
+            if should_continue():
+                on_output(f"ERROR: {e}")
+            return False
+        finally:
+            context.set()
+    
+    def _instance(self, key, params):
+        """Return this thread's warmed YoutubeDL for the given settings, with the _JobContext its hooks read"""
+        instances = getattr(self._local, 'instances', None)
+        if instances is None:
+            instances = self._local.instances = {}
+        if key not in instances:
+            context = _JobContext()
+            params = dict(params, quiet=True, noprogress=True, logger=_YdlLogger(context),
+                          progress_hooks=[lambda status: self._progress_hook(context, status)],
+                          postprocessor_hooks=[lambda status: self._postprocessor_hook(context, status)])
+            instances[key] = (self.yt_dlp.YoutubeDL(params), context)
+        return instances[key]
+    
+    def _progress_hook(self, context, status):
+        job, should_continue = context.job, context.should_continue
+        while job is not None and job.paused and (should_continue is None or should_continue()):
+            job.wait_until_resumed(POLL_INTERVAL)
+        if should_continue and not should_continue():
+            raise self.yt_dlp.utils.DownloadCancelled()
+        if context.on_progress is not None:
+            context.on_progress(ProgressEvent.from_progress_dict('download', status))
+    
+    def _postprocessor_hook(self, context, status):
+        if context.on_progress is not None:
+            context.on_progress(ProgressEvent.from_progress_dict('postprocess', status))
+
+
+def create_backend(prefer="auto"):
+    """Return the in-process engine when yt-dlp is importable, else the subprocess one"""
+    if prefer in ("auto", "in-process"):
+        try:
+            return InProcessBackend()
+        except ImportError:
+            if prefer == "in-process":
+                raise BackendError("The yt_dlp Python package is not installed")
+    return SubprocessBackend()
@@ -0,0 +1,123 @@
+"""Global bandwidth governor shared by every active download job"""
+import re
+import threading
+import time
+
+RATE_RE = re.compile(r'^\s*([\d.]+)\s*([KMG]?)(?:i?B)?\s*$', re.IGNORECASE)
+RATE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+# Seconds of traffic the bucket may bank while jobs are idle
+BURST_SECONDS = 1.0
+
+
+def parse_rate(text):
+    """Parse a rate such as '512K', '2M' or '0' (unlimited) into bytes per second"""
+    if text is None or str(text).strip().lower() in ('', '0', 'unlimited', 'none'):
+        return 0
+    match = RATE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid rate: {text!r} (use e.g. 512K, 2M or 0 for unlimited)")
+    return int(float(match.group(1)) * RATE_UNITS[match.group(2).upper()])
+
+
+def parse_schedule(text):
+    """Parse 'HH:MM-HH:MM=RATE' rules separated by ',' or ';' (ranges may wrap past midnight)"""
+    rules = []
+    for part in re.split(r'[;,]', text or ''):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.match(r'^(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*(.+)$', part)
+        if not match:
+            raise ValueError(f"Invalid schedule rule: {part!r} (use e.g. 09:00-18:00=1M)")
+        start = int(match.group(1)) * 60 + int(match.group(2))
+        end = int(match.group(3)) * 60 + int(match.group(4))
+        rules.append((start, end, parse_rate(match.group(5))))
+    return rules
+
+
+class TokenBucket:
+    """Byte budget refilled at a fixed rate; consumers wait their turn in arrival order"""
+    def __init__(self, rate=0):
+        self.rate = rate
+        self._tokens = rate * BURST_SECONDS
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self._tokens = min(self._tokens, rate * BURST_SECONDS)
+    
+    def consume(self, amount):
+        """Take amount bytes from the bucket, sleeping while it is in debt"""
+        # Holding the lock while sleeping queues other jobs behind us, which keeps sharing fair
+        with self._lock:
+            if not self.rate:
+                return
+            self._refill()
+            self._tokens -= amount
+            if self._tokens < 0:
+                time.sleep(-self._tokens / self.rate)
+                self._refill()
+    
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            self._tokens = min(self.rate * BURST_SECONDS, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+
+class BandwidthGovernor:
+    """One rate limit (optionally by time of day) shared fairly by all active jobs"""
+    def __init__(self, limit=0, schedule=None):
+        self.limit = limit
+        self.schedule = schedule or []
+        self.bucket = TokenBucket(self.current_limit())
+        self._seen_bytes = {}
+        self._lock = threading.Lock()
+    
+    def configure(self, limit=0, schedule=None):
+        """Change the cap (bytes per second, 0 = unlimited) and the time-of-day rules"""
+        self.limit = limit
+        self.schedule = schedule or []
+        self.bucket.set_rate(self.current_limit())
+    
+    def current_limit(self, now=None):
+        """Limit in effect right now: the first matching schedule rule, else the base limit"""
+        now = time.localtime(now)
+        minute = now.tm_hour * 60 + now.tm_min
+        for start, end, rate in self.schedule:
+            in_range = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if in_range:
+                return rate
+        return self.limit
+    
+    def job_started(self, job):
+        with self._lock:
+            self._seen_bytes[job] = 0
+    
+    def job_finished(self, job):
+        with self._lock:
+            self._seen_bytes.pop(job, None)
+    
+    def fair_share(self, workers):
+        """Per-job rate for downloaders that can only take a fixed --limit-rate (0 = unlimited)"""
+        # Set once when the process starts, so one slot per worker keeps the total under the cap however many
+        # jobs run later; a schedule boundary only reaches jobs started after it
+        limit = self.current_limit()
+        return max(1, limit // max(1, workers)) if limit else 0
+    
+    def throttle(self, job, downloaded_bytes):
+        """Charge the job's newly downloaded bytes to the shared bucket; blocks to hold the cap"""
+        limit = self.current_limit()
+        if limit != self.bucket.rate:
+            self.bucket.set_rate(limit)  # A schedule boundary was crossed
+        with self._lock:
+            previous = self._seen_bytes.get(job, 0)
+            # A new file (e.g. the audio stream after the video) restarts the byte count
+            delta = downloaded_bytes - previous if downloaded_bytes >= previous else downloaded_bytes
+            self._seen_bytes[job] = downloaded_bytes
+        if delta > 0:
+            self.bucket.consume(delta)
@@ -0,0 +1,134 @@
+"""On-disk cache of video and playlist metadata"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+
+def default_cache_dir():
+    """Per-user folder for the downloader's caches"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser("~")
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "arijit-yt-downloader")
+
+
+def cache_key_for_url(url):
+    """Return a metadata cache key ('playlist:<id>' or 'video:<id>') for a YouTube URL"""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    query = parse_qs(parsed.query)
+    if query.get('list'):
+        return f"playlist:{query['list'][0]}"
+    if query.get('v'):
+        return f"video:{query['v'][0]}"
+    parts = [part for part in parsed.path.split('/') if part]
+    if 'youtu.be' in parsed.netloc and parts:
+        return f"video:{parts[0]}"
+    if len(parts) >= 2 and parts[0] in ('shorts', 'live', 'embed'):
+        return f"video:{parts[1]}"
+    return None
+
+
+class MetadataCache:
+    """On-disk LRU cache of the video metadata the downloader actually uses"""
+    # Only these fields are kept from yt-dlp's (very large) info dicts
+    FIELDS = ('id', 'title', 'webpage_url', 'playlist', 'playlist_title', 'playlist_id',
+              'playlist_index', 'n_entries', 'playlist_count', 'duration')
+    
+    def __init__(self, path=None, ttl=7 * 24 * 3600, playlist_ttl=6 * 3600, max_size=5000):
+        self.path = path or os.path.join(default_cache_dir(), "metadata.json")
+        self.ttl = ttl
+        self.playlist_ttl = playlist_ttl
+        self.max_size = max_size  # Total number of cached entries (a playlist counts once per video)
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._records = None
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def slim(cls, info):
+        """Strip an info dict down to the cached fields"""
+        slim_info = {field: info[field] for field in cls.FIELDS if info.get(field) is not None}
+        # A flat entry's 'url' is its watch page; a full info dict's 'url' is a media URL
+        if 'webpage_url' not in slim_info and info.get('_type') == 'url' and info.get('url'):
+            slim_info['webpage_url'] = info['url']
+        return slim_info
+    
+    def get(self, key):
+        """Return the cached entry list for key, or None on a miss"""
+        if key is None:
+            return None
+        with self._lock:
+            self._load()
+            record = self._records.get(key)
+            ttl = self.playlist_ttl if key.startswith("playlist:") else self.ttl
+            if record is None or time.time() - record['stored'] > ttl:
+                if record is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._records.move_to_end(key)
+            self.hits += 1
+            return [dict(entry) for entry in record['entries']]
+    
+    def put(self, key, entries, slim=True):
+        """Store the entries for key and persist the cache (as given when slim is False)"""
+        if key is None:
+            return
+        with self._lock:
+            self._load()
+            if key in self._records:
+                self._remove(key)
+            if slim:
+                entries = [self.slim(entry) for entry in entries]
+            self._records[key] = {'stored': time.time(), 'entries': list(entries)}
+            self._size += len(entries)
+            while self._size > self.max_size and len(self._records) > 1:
+                oldest = next(iter(self._records))
+                self._remove(oldest)
+                self.evictions += 1
+            self._save()
+    
+    def stats(self):
+        """Hit/miss counters for the current session"""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': self._size}
+    
+    def _remove(self, key):
+        record = self._records.pop(key)
+        self._size -= len(record['entries'])
+    
+    def _load(self):
+        if self._records is not None:
+            return
+        self._records = OrderedDict()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Stored oldest-first, so insertion order is the LRU order
+            for key, record in data.get('records', []):
+                self._records[key] = record
+                self._size += len(record['entries'])
+        except (OSError, ValueError, KeyError, TypeError):
+            self._records.clear()
+            self._size = 0
+    
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'records': list(self._records.items())}, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # The cache is an optimization; never fail a download over it
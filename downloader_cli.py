@@ -0,0 +1,261 @@
+"""Headless command line / batch mode (no GUI modules are imported)"""
+import argparse
+import os
+import sys
+import time
+
+from downloader_backends import BackendError, create_backend, format_bytes
+from downloader_bandwidth import BandwidthGovernor, parse_rate, parse_schedule
+from downloader_daemon import DEFAULT_DAEMON_URL, DEFAULT_HOST, DEFAULT_PORT, DaemonClient, DaemonError, serve
+from downloader_engine import DownloadEngine, DownloadOptions, validate_url
+from downloader_storage import DEFAULT_MIN_FREE
+from downloader_telemetry import Telemetry
+from downloader_tuning import DEFAULT_MAX_CONNECTIONS, EXTERNAL_DOWNLOADERS
+
+QUALITY_CHOICES = ["2160p", "1440p", "1080p", "720p", "480p", "360p", "240p", "best", "worst"]
+
+# Minimum seconds between aggregate progress lines on the console
+PROGRESS_INTERVAL = 2.0
+DEFAULT_WORKERS = 3
+
+# Settings of the process that downloads; a --daemon client can't pass them on
+LOCAL_ONLY_OPTIONS = (('resume', "--resume"), ('workers', "--workers"),
+                      ('limit_rate', "--limit-rate"), ('rate_schedule', "--rate-schedule"),
+                      ('max_connections', "--max-connections"), ('staging', "--staging"), ('min_free', "--min-free"))
+
+
+def read_url_file(path):
+    """Read URLs from a file: one per line, blank lines and '#' comments ignored"""
+    urls = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                urls.append(line)
+    return urls
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="youtube_downloader_pro.py",
+        description="Download YouTube videos and playlists without opening the window."
+    )
+    parser.add_argument("urls", nargs="*", help="video or playlist URLs")
+    parser.add_argument("-b", "--batch", metavar="FILE", help="file with one URL per line")
+    parser.add_argument("-o", "--output", default=os.path.join(os.path.expanduser("~"), "Downloads"),
+                        help="download folder (default: ~/Downloads)")
+    parser.add_argument("-q", "--quality", default="720p", choices=QUALITY_CHOICES, help="video quality (default: 720p)")
+    parser.add_argument("-a", "--audio-only", action="store_true", help="download audio only (MP3)")
+    parser.add_argument("-p", "--playlist", action="store_true", help="playlist mode (one folder per playlist)")
+    parser.add_argument("-s", "--sync", action="store_true",
+                        help="only download playlist entries added since the last sync into this folder (implies --playlist)")
+    parser.add_argument("-w", "--workers", type=int, help=f"parallel downloads (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--engine", default="auto", choices=["auto", "in-process", "subprocess"],
+                        help="how yt-dlp is run (default: in-process when the yt_dlp package is importable)")
+    parser.add_argument("--limit-rate", metavar="RATE",
+                        help="total bandwidth for all parallel downloads, e.g. 512K or 2M (default: unlimited)")
+    parser.add_argument("--rate-schedule", metavar="RULES",
+                        help="time-of-day limits overriding --limit-rate, e.g. '09:00-18:00=1M,22:00-06:00=0'")
+    parser.add_argument("-N", "--fragments", default="auto",
+                        help="concurrent fragments (connections) per video: a number, or 'auto' to tune from throughput")
+    parser.add_argument("--max-connections", type=int,
+                        help=f"connection budget shared by all parallel downloads (default: {DEFAULT_MAX_CONNECTIONS})")
+    parser.add_argument("--external-downloader", choices=EXTERNAL_DOWNLOADERS,
+                        help="hand each file to a local multi-connection downloader")
+    parser.add_argument("--staging", metavar="DIR",
+                        help="download into DIR (fast local storage) and move finished files to --output in the background")
+    parser.add_argument("--min-free", metavar="SIZE",
+                        help="hold downloads back while a disk would have less than SIZE free (default: 1G, 0 = off)")
+    parser.add_argument("-r", "--resume", action="store_true",
+                        help="first resume jobs left unfinished in the download folder by an earlier run")
+    parser.add_argument("--no-archive", action="store_true",
+                        help="download even if the video is recorded in the folder's download archive")
+    parser.add_argument("--metrics-dir", metavar="DIR",
+                        help="where to write downloads.jsonl and ytdl_downloader.prom, e.g. node_exporter's "
+                             "textfile collector folder (default: the cache folder)")
+    parser.add_argument("--serve", action="store_true",
+                        help="run the shared download daemon instead of downloading (stop with Ctrl+C)")
+    parser.add_argument("--store", metavar="DIR", help="the daemon's content store (default: the cache folder)")
+    parser.add_argument("--listen", metavar="HOST:PORT", default=f"{DEFAULT_HOST}:{DEFAULT_PORT}",
+                        help="where the daemon listens; it has no authentication, so keep it on localhost "
+                             f"or a trusted network (default: {DEFAULT_HOST}:{DEFAULT_PORT})")
+    parser.add_argument("--daemon", metavar="URL", nargs="?", const=DEFAULT_DAEMON_URL,
+                        help=f"let a running daemon fetch the videos, then copy them here; bandwidth, workers and "
+                             f"disk settings are the daemon's own (default: {DEFAULT_DAEMON_URL})")
+    parser.add_argument("--quiet", action="store_true", help="only print errors and the final summary")
+    return parser
+
+
+class ConsoleReporter:
+    """Prints engine callbacks to the terminal"""
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self._last_progress = 0.0
+    
+    def log(self, message):
+        if not self.quiet or message.startswith(("❌", "⚠️")):
+            print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+    
+    def progress(self, percent, message=""):
+        pass  # Per-run milestones are already logged; aggregate progress comes from jobs()
+    
+    def jobs(self, scheduler):
+        now = time.monotonic()
+        if self.quiet or now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        finished = scheduler.completed + scheduler.failed + scheduler.cancelled
+        print(f"[{time.strftime('%H:%M:%S')}] 📊 {scheduler.aggregate_progress():.1f}% — "
+              f"{finished} of {len(scheduler.jobs)} video(s) finished, {len(scheduler.active_jobs())} active, "
+              f"{format_bytes(scheduler.throughput())}/s", flush=True)
+
+
+def count_option(value, default):
+    """A positive count from the command line, or default when the option wasn't given"""
+    return max(1, default if value is None else value)
+
+
+def parse_limits(args):
+    """(BandwidthGovernor, min_free bytes) from the command line; ValueError says which option is wrong"""
+    governor = BandwidthGovernor(parse_rate(args.limit_rate), parse_schedule(args.rate_schedule))
+    try:
+        min_free = parse_rate(args.min_free) if args.min_free is not None else DEFAULT_MIN_FREE  # K/M/G like a rate
+    except ValueError:
+        raise ValueError(f"Invalid --min-free size: {args.min_free!r} (use e.g. 500M, 2G or 0)")
+    return governor, min_free
+
+
+def run_daemon(args, reporter):
+    """Serve the download daemon until Ctrl+C"""
+    host, _, port = args.listen.rpartition(':')
+    if not host or not port.isdigit():
+        print("❌ --listen must look like HOST:PORT", file=sys.stderr)
+        return 2
+    try:
+        governor, min_free = parse_limits(args)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    try:
+        backend = create_backend(args.engine)
+        backend.version()
+    except BackendError as e:
+        print(f"❌ {e}\nPlease install it using:\npip install yt-dlp", file=sys.stderr)
+        return 2
+    try:
+        serve(args.store, host, int(port), count_option(args.workers, DEFAULT_WORKERS), backend, reporter.log,
+              governor=governor, max_connections=count_option(args.max_connections, DEFAULT_MAX_CONNECTIONS),
+              min_free=min_free, telemetry=Telemetry(args.metrics_dir))
+    except OSError as e:
+        print(f"❌ Cannot start the daemon on {args.listen}: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def download_via_daemon(args, urls, options, reporter):
+    """Have the daemon fetch urls and copy the results into the output folder"""
+    client = DaemonClient(args.daemon)
+    try:
+        summary = client.download(urls, args.output, options, playlist=args.playlist, on_log=reporter.log)
+    except KeyboardInterrupt:
+        print("\n⏹️ Download stopped by user", file=sys.stderr)
+        return 130
+    except DaemonError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    ok = summary.ok
+    print(f"{'✅' if ok else '❌'} {summary.completed} of {summary.total} video(s) downloaded, "
+          f"{summary.cancelled} cancelled, {summary.failed} failed")
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    """Run a headless download; returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    reporter = ConsoleReporter(args.quiet)
+    if args.serve:
+        return run_daemon(args, reporter)
+    
+    urls = list(args.urls)
+    if args.batch:
+        try:
+            urls.extend(read_url_file(args.batch))
+        except OSError as e:
+            print(f"❌ Cannot read URL file: {e}", file=sys.stderr)
+            return 2
+    
+    valid_urls = [url for url in urls if validate_url(url)]
+    for url in urls:
+        if url not in valid_urls:
+            print(f"⚠️ Skipping invalid YouTube URL: {url}", file=sys.stderr)
+    if not valid_urls and not args.resume:
+        print("❌ No valid YouTube URLs given", file=sys.stderr)
+        return 2
+    
+    if not os.path.isdir(args.output):
+        print(f"❌ Download folder does not exist: {args.output}", file=sys.stderr)
+        return 2
+    
+    if args.fragments != "auto" and not (args.fragments.isdigit() and int(args.fragments) > 0):
+        print("❌ --fragments must be 'auto' or a positive number", file=sys.stderr)
+        return 2
+    
+    try:
+        governor, min_free = parse_limits(args)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    
+    if args.staging and not os.path.isdir(args.staging):
+        print(f"❌ Staging folder does not exist: {args.staging}", file=sys.stderr)
+        return 2
+    
+    options = DownloadOptions(args.audio_only, args.quality, args.fragments, args.external_downloader)
+    if args.daemon:
+        if args.sync:
+            print("❌ --sync keeps its marks in the download folder and can't be used with --daemon", file=sys.stderr)
+            return 2
+        local = [flag for name, flag in LOCAL_ONLY_OPTIONS if getattr(args, name) not in (None, False)]
+        if local:
+            print(f"❌ {', '.join(local)} can't be used with --daemon: set them where the daemon runs (--serve)",
+                  file=sys.stderr)
+            return 2
+        return download_via_daemon(args, valid_urls, options, reporter)
+    
+    try:
+        backend = create_backend(args.engine)
+        engine = DownloadEngine(backend=backend, on_log=reporter.log, on_progress=reporter.progress, on_jobs=reporter.jobs,
+                                use_archive=not args.no_archive, governor=governor,
+                                max_connections=count_option(args.max_connections, DEFAULT_MAX_CONNECTIONS),
+                                telemetry=Telemetry(args.metrics_dir), min_free=min_free, staging_dir=args.staging)
+        version = engine.backend_version()
+    except BackendError as e:
+        print(f"❌ {e}\nPlease install it using:\npip install yt-dlp", file=sys.stderr)
+        return 2
+    reporter.log(f"⚙️ Using {backend.name} yt-dlp engine (version {version})")
+    
+    workers = count_option(args.workers, DEFAULT_WORKERS)
+    summaries = []
+    try:
+        if args.resume:
+            summaries.append(engine.resume(args.output, workers=workers))
+        if valid_urls and not (summaries and summaries[-1].stopped):
+            summaries.append(engine.download(valid_urls, args.output, options, playlist=args.playlist, workers=workers,
+                                             sync=args.sync))
+    except KeyboardInterrupt:
+        engine.stop()
+        print("\n⏹️ Download stopped by user", file=sys.stderr)
+        return 130
+    finally:
+        engine.close()
+    
+    completed = sum(summary.completed for summary in summaries)
+    total = sum(summary.total for summary in summaries)
+    skipped = sum(summary.skipped for summary in summaries)
+    failed = sum(summary.failed for summary in summaries)
+    # A sync that found nothing new is up to date, not a failure
+    up_to_date = any(summary.up_to_date for summary in summaries)
+    ok = failed == 0 and not any(summary.stopped for summary in summaries) and (total > 0 or args.resume or up_to_date)
+    print(f"{'✅' if ok else '❌'} {completed} of {total} video(s) downloaded, "
+          f"{skipped} already downloaded, {failed} failed")
+    return 0 if ok else 1
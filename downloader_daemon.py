@@ -0,0 +1,510 @@
+"""Long-running download daemon with a local HTTP API and a shared, content-addressed file store
+
+Identical requests (same video, same format) are fetched once; finished files are kept by
+SHA-256 and served to every client over HTTP. The GUI and the CLI are clients (DaemonClient).
+"""
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from downloader_cache import default_cache_dir
+from downloader_engine import (UNSAFE_PATH_CHARS, DownloadEngine, DownloadJob, DownloadOptions, DownloadSummary,
+                               template_literal, validate_url)
+from downloader_storage import DEFAULT_MIN_FREE
+from downloader_tuning import DEFAULT_MAX_CONNECTIONS, EXTERNAL_DOWNLOADERS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_DAEMON_URL = os.environ.get('YTDL_DAEMON_URL', f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+INDEX_FILENAME = "index.json"
+QUALITY_RE = re.compile(r'^(best|worst|\d+p\b.*)$')
+TERMINAL_STATES = ("done", "failed", "cancelled", "stopped")
+COPY_CHUNK = 1024 * 1024
+METRICS_INTERVAL = 15.0  # Seconds between Prometheus file refreshes while serving
+
+
+class DaemonError(Exception):
+    """Raised when the daemon rejects a call or can't be reached"""
+
+
+def default_store_dir():
+    return os.path.join(default_cache_dir(), "store")
+
+
+def safe_filename(text):
+    """Replace characters that are not allowed in file names"""
+    cleaned = ''.join('_' if ch in UNSAFE_PATH_CHARS else ch for ch in str(text)).strip()
+    return cleaned or '_'
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentStore:
+    """Finished files stored once under their SHA-256, indexed by video ID and format"""
+    def __init__(self, root):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._index = {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            pass
+    
+    @staticmethod
+    def key(video_id, format_key):
+        return f"{video_id}|{format_key}"
+    
+    def object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest)
+    
+    def lookup(self, key):
+        """The stored record for key, or None (also when its file has gone missing)"""
+        with self._lock:
+            record = self._index.get(key)
+        if record and os.path.exists(self.object_path(record['digest'])):
+            return dict(record)
+        return None
+    
+    def find_digest(self, digest):
+        """A record whose file has this digest, or None"""
+        with self._lock:
+            record = next((record for record in self._index.values() if record['digest'] == digest), None)
+        if record and os.path.exists(self.object_path(digest)):
+            return dict(record)
+        return None
+    
+    def ingest(self, path, key, title):
+        """Move a finished download into the store (identical content is kept once)"""
+        digest = file_digest(path)
+        target = self.object_path(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            os.replace(path, target)
+        record = {'digest': digest, 'size': os.path.getsize(target), 'filename': os.path.basename(path),
+                  'title': title, 'stored': time.time()}
+        with self._lock:
+            self._index[key] = record
+            self._save()
+        return dict(record)
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+    
+    def _save(self):
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+
+
+class DownloadDaemon:
+    """Wraps one DownloadEngine session shared by every client request"""
+    def __init__(self, store_dir=None, workers=3, backend=None, on_log=None, governor=None,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, min_free=DEFAULT_MIN_FREE, telemetry=None):
+        self.store = ContentStore(store_dir or default_store_dir())
+        self.staging = os.path.join(self.store.root, "staging")
+        self.workers = workers
+        self.on_log = on_log or (lambda message: None)
+        # Bandwidth, connections and disk reserve are the daemon's own: every client shares one link and disk
+        self.engine = DownloadEngine(backend=backend, on_log=self.on_log, on_job_done=self.job_done, use_archive=False,
+                                     governor=governor, max_connections=max_connections, min_free=min_free,
+                                     telemetry=telemetry)
+        self.jobs = {}  # Store key -> the latest DownloadJob fetching it
+        self.requests = OrderedDict()  # Request ID -> submitted request
+        self._lock = threading.Lock()
+        self._indexes = itertools.count(1)
+        self._stopping = threading.Event()
+    
+    def start(self):
+        """Open the engine session and pick up fetches left unfinished by the last run"""
+        os.makedirs(self.staging, exist_ok=True)
+        self.engine.start_session(self.staging, self.workers)
+        found, _ = self.engine.queue_unfinished()
+        with self._lock:
+            for job in self.engine.scheduler.jobs:
+                self.jobs[ContentStore.key(job.video_id, job.options.archive_key())] = job
+            self._indexes = itertools.count(found + 1)
+        threading.Thread(target=self._refresh_metrics, name="daemon-metrics", daemon=True).start()
+    
+    def close(self):
+        """Stop running fetches (they are resumed by the next start()) and end the engine session"""
+        self._stopping.set()
+        self.engine.stop()
+        # Releases the workers, closes the job store and writes the run record
+        self.engine.finish_session()
+        self.engine.close()
+    
+    def _refresh_metrics(self):
+        # A run only ends when the daemon stops, so the scraped file is kept current in between
+        while True:
+            self.engine.telemetry.refresh()
+            if self._stopping.wait(METRICS_INTERVAL):
+                break
+    
+    def submit(self, url, options, playlist=False):
+        """Accept a request; its videos are resolved and queued in the background"""
+        request = {'id': uuid.uuid4().hex[:12], 'url': url, 'playlist': playlist, 'options': options.to_dict(),
+                   'status': "resolving", 'error': None, 'withdrawn': False, 'created': time.time(),
+                   'keys': [], 'entries': {}}
+        with self._lock:
+            self.requests[request['id']] = request
+        threading.Thread(target=self._resolve, args=(request, options), daemon=True).start()
+        return self.request_view(request['id'])
+    
+    def _resolve(self, request, options):
+        if request['playlist']:
+            entries = self.engine.iter_playlist_entries(request['url'])
+        else:
+            entries = self.engine.get_video_info(request['url']) or []
+        
+        for info in entries:
+            if request['withdrawn']:
+                break
+            key = ContentStore.key(info.get('id'), options.archive_key())
+            with self._lock:
+                request['keys'].append(key)
+                request['entries'][key] = {field: info.get(field) for field in
+                                           ('playlist', 'playlist_index', 'n_entries', 'title')}
+                if self.store.lookup(key) is not None:
+                    continue  # Already fetched for someone else
+                job = self.jobs.get(key)
+                if job is not None and job.status not in ("failed", "cancelled", "stopped"):
+                    continue  # Being fetched right now; this request shares it
+                # One staging folder per video and format, so concurrent fetches never collide
+                folder = template_literal(f"{info.get('id')}-{hashlib.sha1(key.encode()).hexdigest()[:8]}")
+                job = DownloadJob(next(self._indexes), info, os.path.join(self.staging, folder, '%(title)s.%(ext)s'),
+                                  options)
+                self.jobs[key] = job
+            self.engine.submit(job, info)
+        
+        with self._lock:
+            if request['keys']:
+                request['status'] = "queued"
+            else:
+                request['status'] = "failed"
+                request['error'] = "No videos found for this URL"
+    
+    def job_done(self, job, success):
+        """Move a finished fetch into the content store"""
+        if not success or not job.output_path or not os.path.exists(job.output_path):
+            return
+        key = ContentStore.key(job.video_id, job.options.archive_key())
+        try:
+            record = self.store.ingest(job.output_path, key, job.title)
+        except OSError as e:
+            self.on_log(f"❌ [{job.index}] Could not store {os.path.basename(job.output_path)}: {e}")
+            return
+        self.on_log(f"🗄️ [{job.index}] Stored {record['filename']} ({record['digest'][:12]})")
+        folder = os.path.dirname(job.output_template)
+        if os.path.dirname(os.path.abspath(folder)) == os.path.abspath(self.staging):
+            shutil.rmtree(folder, ignore_errors=True)  # The video's own staging folder, now empty
+    
+    def withdraw(self, request_id):
+        """Drop a request; fetches no other request is waiting for are cancelled"""
+        with self._lock:
+            request = self.requests.get(request_id)
+            if request is None:
+                return False
+            request['withdrawn'] = True
+            wanted = {key for other in self.requests.values() if not other['withdrawn'] for key in other['keys']}
+            orphans = [self.jobs[key] for key in request['keys'] if key not in wanted and key in self.jobs]
+        for job in orphans:
+            self.engine.cancel_job(job)
+        return True
+    
+    def cancel(self, index):
+        """Cancel one fetch for every request sharing it"""
+        job = self.engine.find_job(index)
+        return job is not None and self.engine.cancel_job(job)
+    
+    def job_view(self, key):
+        video_id, format_key = key.split('|', 1)
+        view = {'key': key, 'video_id': video_id, 'format': format_key}
+        job = self.jobs.get(key)
+        if job is not None:
+            view.update(index=job.index, title=job.title, status=job.status, percent=round(job.percent, 1),
+                        speed=job.speed, eta=job.eta)
+        record = self.store.lookup(key)
+        if record is not None:
+            view.update(record, status="done", percent=100.0)
+        elif view.get('status') == "done":
+            view['status'] = "failed"  # Downloaded, but the file never reached the store
+        view.setdefault('status', "unknown")
+        return view
+    
+    def jobs_view(self):
+        with self._lock:
+            keys = list(self.jobs)
+        return [self.job_view(key) for key in keys]
+    
+    def request_view(self, request_id):
+        with self._lock:
+            request = self.requests.get(request_id)
+            if request is None:
+                return None
+            keys = list(request['keys'])
+            view = {field: request[field] for field in ('id', 'url', 'playlist', 'options', 'status', 'error',
+                                                        'withdrawn', 'created')}
+            entries = dict(request['entries'])
+        view['jobs'] = [dict(self.job_view(key), **{field: value for field, value in entries[key].items()
+                                                      if field != 'title' and value is not None})
+                        for key in keys]
+        if view['status'] == "queued" and all(job['status'] in TERMINAL_STATES for job in view['jobs']):
+            view['status'] = "finished"
+        return view
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """JSON API: POST/GET /jobs, DELETE /jobs/<index>, GET/DELETE /requests/<id>, GET /files/<sha256>"""
+    daemon = None  # Set by serve()
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if parts == ['health']:
+            engine = self.daemon.engine
+            self.send_json({'backend': engine.backend.name, 'jobs': len(self.daemon.jobs),
+                            'stored': len(self.daemon.store)})
+        elif parts == ['jobs']:
+            self.send_json(self.daemon.jobs_view())
+        elif len(parts) == 2 and parts[0] == 'requests':
+            view = self.daemon.request_view(parts[1])
+            self.send_json(view) if view else self.send_json({'error': "Unknown request"}, 404)
+        elif len(parts) == 2 and parts[0] == 'files':
+            self.send_file(parts[1])
+        else:
+            self.send_json({'error': "Not found"}, 404)
+    
+    def do_POST(self):
+        if self.path.strip('/') != 'jobs':
+            self.send_json({'error': "Not found"}, 404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            url = body['url']
+            quality = body.get('quality', "720p")
+            fragments = str(body.get('fragments') or "auto")
+            external_downloader = body.get('external_downloader')
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.send_json({'error': "Expected a JSON body with a 'url'"}, 400)
+            return
+        if not validate_url(url):
+            self.send_json({'error': "Not a valid YouTube URL"}, 400)
+            return
+        if not QUALITY_RE.match(str(quality)):
+            self.send_json({'error': f"Invalid quality: {quality}"}, 400)
+            return
+        if fragments != "auto" and not (fragments.isdigit() and int(fragments) > 0):
+            self.send_json({'error': f"Invalid fragments: {fragments}"}, 400)
+            return
+        if external_downloader is not None and external_downloader not in EXTERNAL_DOWNLOADERS:
+            self.send_json({'error': f"Unsupported external downloader: {external_downloader}"}, 400)
+            return
+        options = DownloadOptions(bool(body.get('audio_only')), quality, fragments, external_downloader)
+        self.send_json(self.daemon.submit(url, options, bool(body.get('playlist'))), 202)
+    
+    def do_DELETE(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'requests':
+            found = self.daemon.withdraw(parts[1])
+        elif len(parts) == 2 and parts[0] == 'jobs' and parts[1].isdigit():
+            found = self.daemon.cancel(int(parts[1]))
+        else:
+            found = False
+        self.send_json({'ok': found}, 200 if found else 404)
+    
+    def send_json(self, data, status=200):
+        payload = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def send_file(self, digest):
+        record = self.daemon.store.find_digest(digest) if re.fullmatch(r'[0-9a-f]{64}', digest) else None
+        if record is None:
+            self.send_json({'error': "Unknown file"}, 404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(record['size']))
+        self.end_headers()
+        with open(self.daemon.store.object_path(digest), 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, COPY_CHUNK)
+    
+    def log_message(self, format, *args):
+        pass  # Requests are not worth a status log line each
+
+
+def serve(store_dir=None, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=3, backend=None, on_log=None, **engine_options):
+    """Run the daemon until interrupted; engine_options (governor, max_connections, ...) go to DownloadDaemon"""
+    on_log = on_log or print
+    daemon = DownloadDaemon(store_dir, workers, backend, on_log, **engine_options)
+    daemon.start()
+    handler = type('BoundDaemonHandler', (DaemonHandler,), {'daemon': daemon})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    on_log(f"🛰️ Download daemon listening on http://{host}:{server.server_address[1]} "
+           f"(store: {daemon.store.root}, {len(daemon.store)} file(s))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
+        on_log("⏹️ Download daemon stopped")
+
+
+class DaemonClient:
+    """Talks to a running daemon; used by the GUI and the CLI instead of a local engine"""
+    def __init__(self, url=None, timeout=10):
+        self.url = (url or DEFAULT_DAEMON_URL).rstrip('/')
+        self.timeout = timeout
+    
+    def call(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = Request(f"{self.url}{path}", data=data, method=method,
+                          headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read() or b'null')
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error')
+            except (ValueError, AttributeError):
+                message = None
+            raise DaemonError(message or f"Daemon returned HTTP {e.code}")
+        except OSError as e:
+            raise DaemonError(f"Download daemon not reachable at {self.url}: {e}")
+    
+    def available(self):
+        try:
+            self.call('GET', '/health')
+            return True
+        except DaemonError:
+            return False
+    
+    def submit(self, url, options, playlist=False):
+        """Bandwidth, parallel downloads, staging and the disk reserve are set where the daemon runs"""
+        return self.call('POST', '/jobs', dict(options.to_dict(), url=url, playlist=playlist))
+    
+    def request(self, request_id):
+        return self.call('GET', f"/requests/{request_id}")
+    
+    def withdraw(self, request_id):
+        return self.call('DELETE', f"/requests/{request_id}")
+    
+    def fetch(self, digest, destination):
+        """Copy a stored file to destination (written to a temporary name first)"""
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        temp_path = f"{destination}.part"
+        try:
+            with urlopen(f"{self.url}/files/{digest}", timeout=self.timeout) as response, open(temp_path, 'wb') as f:
+                shutil.copyfileobj(response, f, COPY_CHUNK)
+        except OSError as e:
+            raise DaemonError(f"Could not fetch {os.path.basename(destination)}: {e}")
+        os.replace(temp_path, destination)
+    
+    @staticmethod
+    def destination(download_path, job):
+        """Where a finished job goes in the client's folder (same layout as local downloads)"""
+        filename = safe_filename(job.get('filename') or f"{job['video_id']}")
+        if job.get('playlist'):
+            index_width = len(str(job.get('n_entries') or job.get('playlist_index') or 1))
+            position = str(job.get('playlist_index') or 1).zfill(index_width)
+            return os.path.join(download_path, safe_filename(job['playlist']), f"{position} - {filename}")
+        return os.path.join(download_path, filename)
+    
+    def download(self, urls, download_path, options, playlist=False, on_log=None, on_progress=None,
+                 should_continue=None, poll_interval=0.5):
+        """Submit urls, wait for the daemon to fetch them, then copy the files; returns a DownloadSummary"""
+        on_log = on_log or (lambda message: None)
+        on_progress = on_progress or (lambda percent, message="": None)
+        should_continue = should_continue or (lambda: True)
+        
+        request_ids = []
+        for url in urls:
+            request_ids.append(self.submit(url, options, playlist)['id'])
+        on_log(f"🛰️ Submitted {len(request_ids)} request(s) to the download daemon at {self.url}")
+        
+        reported = {}
+        try:
+            while True:
+                views = [self.request(request_id) for request_id in request_ids]
+                jobs = [job for view in views for job in view['jobs']]
+                for job in jobs:
+                    status = job['status']
+                    if reported.get(job['key']) != status:
+                        reported[job['key']] = status
+                        title = job.get('title') or job['video_id']
+                        if status == "downloading":
+                            on_log(f"⬇️ [daemon] {title}")
+                        elif status == "failed":
+                            on_log(f"❌ [daemon] Failed: {title}")
+                for view in views:
+                    if view['error'] and reported.get(view['id']) is None:
+                        reported[view['id']] = view['error']
+                        on_log(f"❌ {view['url']}: {view['error']}")
+                
+                ready = sum(1 for job in jobs if job['status'] == "done")
+                if jobs:
+                    percent = sum(100.0 if job['status'] in TERMINAL_STATES else job.get('percent') or 0.0
+                                  for job in jobs) / len(jobs)
+                    on_progress(percent * 0.95, f"Daemon: {ready} of {len(jobs)} video(s) ready")
+                if all(view['status'] in ("finished", "failed") for view in views):
+                    break
+                if not should_continue():
+                    for request_id in request_ids:
+                        self.withdraw(request_id)
+                    return DownloadSummary(len(jobs), 0, 0, True)
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            for request_id in request_ids:
+                self.withdraw(request_id)
+            raise
+        
+        completed = failed = cancelled = 0
+        for job in jobs:
+            if job['status'] != "done":
+                if job['status'] == "cancelled":
+                    cancelled += 1
+                else:
+                    failed += 1
+                continue
+            destination = self.destination(download_path, job)
+            if os.path.exists(destination) and os.path.getsize(destination) == job['size']:
+                completed += 1
+                continue
+            try:
+                self.fetch(job['digest'], destination)
+            except DaemonError as e:
+                on_log(f"❌ {e}")
+                failed += 1
+                continue
+            completed += 1
+            on_log(f"📁 Saved: {os.path.basename(destination)}")
+        return DownloadSummary(len(jobs), completed, failed, False, 0, cancelled)
@@ -0,0 +1,910 @@
+"""Download engine shared by the GUI and the headless command line"""
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+from downloader_archive import DownloadArchive
+from downloader_backends import BackendError, create_backend, format_bytes
+from downloader_bandwidth import BandwidthGovernor
+from downloader_cache import MetadataCache, cache_key_for_url
+from downloader_formats import FormatPlan, plan_format, typical_size
+from downloader_jobs import JobStore
+from downloader_postprocess import PostProcessPool
+from downloader_storage import (ADMISSION_POLL, DEFAULT_MIN_FREE, StagingMover, free_bytes, is_within,
+                                same_disk)
+from downloader_sync import PlaylistScan, SyncState, newest_first, playlist_key
+from downloader_telemetry import Telemetry
+from downloader_tuning import DEFAULT_MAX_CONNECTIONS, FragmentTuner, find_external_downloader
+
+
+# yt-dlp output lines worth surfacing in the log
+IMPORTANT_LINE_RE = re.compile(r'error|warning|failed', re.IGNORECASE)
+
+# Lines that name the file a job produces (the last one wins, e.g. the MP3 after extraction)
+OUTPUT_FILE_RE = re.compile(
+    r'^\[\w+\] (?:Destination: (?P<dest>.+)|Merging formats into "(?P<merged>.+)"|(?P<existing>.+) has already been downloaded(?: and merged)?)$'
+)
+
+# Characters that are not allowed in folder/file names on common filesystems
+UNSAFE_PATH_CHARS = '<>:"/\\|?*'
+
+
+def template_literal(text):
+    """Make text safe to embed literally in a yt-dlp output template"""
+    cleaned = ''.join('_' if ch in UNSAFE_PATH_CHARS else ch for ch in str(text)).strip()
+    return (cleaned or '_').replace('%', '%%')
+
+
+def validate_url(url):
+    """Validate YouTube URL"""
+    youtube_domains = ['youtube.com', 'youtu.be', 'www.youtube.com', 'm.youtube.com']
+    try:
+        parsed = urlparse(url)
+        return any(domain in parsed.netloc for domain in youtube_domains)
+    except:
+        return False
+
+
+class DownloadOptions:
+    """User-selected download settings shared by every job of a run"""
+    def __init__(self, audio_only=False, quality="720p", fragments="auto", external_downloader=None):
+        self.audio_only = audio_only
+        self.quality = quality
+        self.fragments = fragments  # "auto" (tuned per job) or a fixed concurrent fragment count
+        self.external_downloader = external_downloader  # e.g. "aria2c", or None for yt-dlp's own
+    
+    def format_selector(self):
+        """yt-dlp format selector for the chosen quality"""
+        if self.audio_only:
+            return 'bestaudio/best'
+        if self.quality in ['best', 'worst']:
+            return self.quality
+        # Extract number from quality (e.g., "720p (HD)" -> "720")
+        quality_num = self.quality.split('p')[0]
+        return f'best[height<={quality_num}]'
+    
+    def to_dict(self):
+        return {'audio_only': self.audio_only, 'quality': self.quality,
+                'fragments': self.fragments, 'external_downloader': self.external_downloader}
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('audio_only', False), data.get('quality', "720p"),
+                   data.get('fragments', "auto"), data.get('external_downloader'))
+    
+    def archive_key(self):
+        """Identifies the output format in the download archive"""
+        return 'audio:mp3' if self.audio_only else f'video:{self.format_selector()}'
+
+
+class DownloadJob:
+    """A single video scheduled for download"""
+    def __init__(self, index, info, output_template, options=None):
+        self.index = index
+        self.info = info
+        self.video_id = info.get('id')
+        self.title = info.get('title') or self.video_id or f"Video {index}"
+        if info.get('webpage_url'):
+            self.url = info['webpage_url']
+        elif self.video_id:
+            self.url = f"https://www.youtube.com/watch?v={self.video_id}"
+        else:
+            self.url = info.get('url')
+        self.output_template = output_template
+        self.options = options or DownloadOptions()
+        self.output_path = None
+        self.part_path = None
+        self.rate_limit = 0  # Bytes per second for backends that cap each process separately
+        self.fragments = 1  # Concurrent fragments (or external downloader connections) for this run
+        self.downloaded_bytes = 0
+        self.percent = 0.0
+        self.status = "queued"  # queued, downloading, processing, done, failed, stopped, cancelled
+        self.phase = "download"
+        self.speed = None
+        self.eta = None
+        self.format_plan = None  # FormatPlan picked from the video's format table, if it had one
+        self.postprocess = None  # Post-processing task run on the process pool after the download
+        self.timings = {}  # Seconds spent in each stage
+        self.submitted_at = None
+        self.peak_speed = 0.0
+        self.attempts = 0  # Including earlier sessions when resumed
+        
+        # Per-job control; the backend watches these while the job runs
+        self.process = None  # The job's own yt-dlp process (subprocess backend)
+        self.cancelled = False
+        self._resumed = threading.Event()
+        self._resumed.set()
+    
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+    
+    @property
+    def splits_download(self):
+        """Whether more connections can help: yt-dlp only splits DASH/HLS formats, aria2c splits any file"""
+        if self.options.external_downloader:
+            return True
+        return self.format_plan is not None and self.format_plan.fragmented
+    
+    def pause(self):
+        self._resumed.clear()
+        self.speed = self.eta = None
+    
+    def resume(self):
+        self._resumed.set()
+    
+    def cancel(self):
+        """Abort this job only; a paused job is released so it can exit"""
+        self.cancelled = True
+        self._resumed.set()
+    
+    def wait_until_resumed(self, timeout=None):
+        return self._resumed.wait(timeout)
+    
+    def format_selector(self):
+        """yt-dlp format selector: the planned formats, else the quality's generic selector"""
+        if self.format_plan is not None:
+            return self.format_plan.selector()
+        return self.options.format_selector()
+
+
+class DownloadScheduler:
+    """Run download jobs concurrently on a fixed number of worker threads"""
+    def __init__(self, run_job, workers=3, on_update=None):
+        self.run_job = run_job
+        self.workers = max(1, int(workers))
+        self.on_update = on_update
+        
+        self.jobs = []
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pending = set()  # Futures of jobs still in post-processing
+        self._idle = threading.Condition(self._lock)
+        self._stopped = False
+    
+    def start(self):
+        """Spawn the worker threads"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"download-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self, job):
+        """Queue a job for download"""
+        with self._lock:
+            self.jobs.append(job)
+        self._queue.put(job)
+        self._notify()
+    
+    def close(self):
+        """Signal that no more jobs will be submitted"""
+        for _ in self._threads:
+            self._queue.put(None)
+    
+    def stop(self):
+        """Stop picking up queued jobs; running jobs are left to their runner"""
+        self._stopped = True
+        with self._lock:
+            for job in self.jobs:
+                if job.status == "queued":
+                    job.status = "stopped"
+    
+    def wait(self, timeout=None):
+        """Block until every worker has exited and all post-processing has finished (or timeout passes)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        remaining = lambda: None if deadline is None else max(0.0, deadline - time.monotonic())
+        for thread in self._threads:
+            thread.join(remaining())
+        with self._lock:
+            while self._pending and remaining() != 0.0:
+                self._idle.wait(remaining())
+    
+    def record_progress(self, job, event):
+        """Record a ProgressEvent for one job and notify listeners"""
+        job.phase = event.phase
+        if event.phase == 'download':
+            job.speed = event.speed
+            job.eta = event.eta
+            if event.percent is not None:
+                job.percent = max(0.0, min(100.0, event.percent))
+        else:
+            job.speed = job.eta = None
+        self._notify()
+    
+    def throughput(self):
+        """Combined download speed of the active jobs, in bytes per second"""
+        return sum(job.speed or 0 for job in self.active_jobs())
+    
+    def active_jobs(self):
+        """Jobs currently being downloaded or post-processed"""
+        with self._lock:
+            return [job for job in self.jobs if job.status in ("downloading", "processing")]
+    
+    def aggregate_progress(self):
+        """Overall progress across all submitted jobs, in percent"""
+        with self._lock:
+            if not self.jobs:
+                return 0.0
+            total = sum(100.0 if job.status in ("done", "failed", "cancelled") else job.percent for job in self.jobs)
+            return total / len(self.jobs)
+    
+    def _notify(self):
+        if self.on_update:
+            self.on_update(self)
+    
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if self._stopped or job.status != "queued":
+                continue
+            if job.cancelled:
+                self._finish_job(job, False)
+                continue
+            
+            job.status = "downloading"
+            self._notify()
+            try:
+                success = self.run_job(job)
+            except Exception:
+                success = False
+            
+            if isinstance(success, Future):
+                # The download is done; post-processing finishes the job later on another stage
+                with self._lock:
+                    job.status = "processing"
+                    job.phase = "postprocess"
+                    job.speed = job.eta = None
+                    self._pending.add(success)
+                success.add_done_callback(lambda future, job=job: self._finish(job, future))
+                self._notify()
+                continue
+            self._finish_job(job, success)
+    
+    def _finish(self, job, future):
+        self._finish_job(job, not future.exception() and future.result())
+        with self._lock:
+            self._pending.discard(future)
+            self._idle.notify_all()
+    
+    def _finish_job(self, job, success):
+        with self._lock:
+            if job.cancelled and not success:
+                job.status = "cancelled"
+                self.cancelled += 1
+            elif self._stopped and not success:
+                job.status = "stopped"
+            elif success:
+                job.status = "done"
+                job.percent = 100.0
+                self.completed += 1
+            else:
+                job.status = "failed"
+                self.failed += 1
+        self._notify()
+
+
+class DownloadSummary:
+    """Outcome of one DownloadEngine.download run"""
+    def __init__(self, total=0, completed=0, failed=0, stopped=False, skipped=0, cancelled=0, up_to_date=False):
+        self.total = total
+        self.completed = completed
+        self.failed = failed
+        self.stopped = stopped
+        self.skipped = skipped  # Already in the download archive
+        self.cancelled = cancelled  # Cancelled one by one while the others kept going
+        self.up_to_date = up_to_date  # A sync listed every playlist up to its last sync, new videos or not
+    
+    @property
+    def ok(self):
+        return (self.total > 0 or self.up_to_date) and self.failed == 0 and not self.stopped
+
+
+class DownloadEngine:
+    """Fetches metadata and runs download jobs; reports through callbacks, never touches a UI"""
+    def __init__(self, backend=None, metadata_cache=None, on_log=None, on_progress=None, on_jobs=None, on_job_done=None,
+                 use_archive=True, governor=None, max_connections=DEFAULT_MAX_CONNECTIONS, postprocess_pool=None,
+                 telemetry=None, min_free=DEFAULT_MIN_FREE, staging_dir=None):
+        self.backend = backend or create_backend()
+        self.postprocess_pool = postprocess_pool or PostProcessPool()
+        self.telemetry = telemetry or Telemetry()
+        self.governor = governor or BandwidthGovernor()
+        self.tuner = FragmentTuner(max_connections)
+        self._missing_downloaders = set()
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.use_archive = use_archive
+        self.on_log = on_log or (lambda message: None)
+        self.on_progress = on_progress or (lambda percent, message="": None)
+        self.on_jobs = on_jobs or (lambda scheduler: None)
+        self.on_job_done = on_job_done or (lambda job, success: None)
+        
+        # Jobs are held back while a disk would drop below min_free; with a staging folder, files are
+        # downloaded there and moved to the download folder in the background
+        self.min_free = min_free
+        self.staging_dir = staging_dir
+        self.mover = StagingMover(on_moved=self.staged_file_moved, on_error=self.staged_move_failed)
+        self._admission_lock = threading.Lock()
+        
+        self.options = DownloadOptions()
+        self.archive = None
+        self.job_store = None
+        self.scheduler = None
+        self.download_path = None
+        self.is_running = False
+        self.expected_bytes = 0  # Planned size of the jobs submitted in this run
+        self.planned_jobs = 0
+        self.estimated_bytes = 0  # Guessed from the duration for jobs without a plan
+    
+    def log_message(self, message):
+        self.on_log(message)
+    
+    def update_progress(self, percent, message=""):
+        self.on_progress(percent, message)
+    
+    def stop(self):
+        """Stop queued jobs and ask running ones to abort"""
+        self.is_running = False
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            for job in self.scheduler.active_jobs():
+                job.resume()  # Paused jobs must run again to notice the stop
+    
+    def find_job(self, index):
+        """The job with this index in the current run, or None"""
+        if self.scheduler is None:
+            return None
+        return next((job for job in self.scheduler.jobs if job.index == index), None)
+    
+    def pause_job(self, job):
+        """Suspend one running job; returns False when the backend can't pause"""
+        if not self.backend.can_pause or job.status != "downloading" or job.paused:
+            return False
+        job.pause()
+        self.log_message(f"⏸️ [{job.index}] Paused: {job.title}")
+        self.on_jobs(self.scheduler)
+        return True
+    
+    def resume_job(self, job):
+        """Continue a paused job"""
+        if not job.paused:
+            return False
+        job.resume()
+        self.log_message(f"▶️ [{job.index}] Resumed: {job.title}")
+        self.on_jobs(self.scheduler)
+        return True
+    
+    def cancel_job(self, job):
+        """Cancel one queued or running job; the rest of the run continues"""
+        if job.status not in ("queued", "downloading") or job.cancelled:
+            return False
+        if job.status == "queued":
+            self.job_store.set_state(job, "cancelled")
+        job.cancel()
+        self.log_message(f"⏹️ [{job.index}] Cancelling: {job.title}")
+        return True
+    
+    def close(self, timeout=5):
+        """Stop running jobs, give their processes time to exit, then release the post-processing workers"""
+        if self.is_running:
+            self.stop()
+        if self.scheduler is not None:
+            self.scheduler.wait(timeout)
+        self.mover.close()
+        self.postprocess_pool.shutdown()
+    
+    def backend_version(self):
+        """The backend's yt-dlp version (raises BackendError when missing); timed as the dependency check"""
+        started = time.monotonic()
+        try:
+            return self.backend.version()
+        finally:
+            self.telemetry.record_phase('dependency_check', time.monotonic() - started)
+    
+    def get_video_info(self, url):
+        """Get video information using yt-dlp (served from the metadata cache when possible)"""
+        cache_key = cache_key_for_url(url)
+        cached = self.metadata_cache.get(cache_key)
+        if cached:
+            self.log_message(f"🗃️ Using cached information for {len(cached)} video(s)")
+            return cached
+        
+        started = time.monotonic()
+        try:
+            videos = self.backend.extract_info(url)
+        except BackendError as e:
+            self.log_message(str(e))
+            return None
+        finally:
+            self.telemetry.record_phase('metadata', time.monotonic() - started)
+        self.metadata_cache.put(cache_key, videos)
+        return videos
+    
+    def iter_playlist_entries(self, url):
+        """Yield entries as yt-dlp enumerates them (flat extraction, no per-video requests)"""
+        cache_key = cache_key_for_url(url)
+        cached = self.metadata_cache.get(cache_key)
+        if cached:
+            self.log_message(f"🗃️ Using cached playlist listing ({len(cached)} video(s))")
+            for entry in cached:
+                if not self.is_running:
+                    break
+                yield entry
+            return
+        
+        entries = []
+        try:
+            for entry in self.list_playlist(url):
+                entries.append(entry)
+                yield entry
+        except BackendError as e:
+            if self.is_running:
+                self.log_message(str(e))
+            return
+        
+        if self.is_running and entries:
+            self.metadata_cache.put(cache_key, entries)
+    
+    def iter_new_entries(self, url, sync_state, scans):
+        """Yield only the entries added since this folder's last sync; listing stops at the high-water mark"""
+        key = playlist_key(url)
+        mark = sync_state.mark(key)
+        newest = newest_first(url)
+        scan = PlaylistScan(mark, newest)
+        if not mark.empty:
+            where = "newest first" if newest else f"from entry {scan.start}"
+            self.log_message(f"🔁 Syncing against {len(mark.seen)} known video(s), listing {where}")
+        try:
+            for attempt in range(2):
+                ended = yield from self._scan_playlist(url, scan)
+                scan.complete = ended
+                if not scan.finish() or not self.is_running:
+                    break
+                self.log_message("⚠️ Playlist changed since the last sync, listing it in full")
+                scan = PlaylistScan(mark, newest, full=True)
+        finally:
+            # Saved by download() once it knows which of the offered entries finished
+            scans.append((key, scan))
+        stop = "reached the last sync" if scan.reached_mark else "end of playlist"
+        self.log_message(f"🔁 {scan.new} new video(s) since the last sync ({scan.listed} listed, {stop})")
+    
+    def _scan_playlist(self, url, scan):
+        """Feed the listing to scan and yield what it lets through; returns True when the listing ended"""
+        try:
+            for entry in self.list_playlist(url, scan.start):
+                entries = scan.feed(entry)
+                if entries is None:
+                    return False
+                yield from entries
+        except BackendError as e:
+            if self.is_running:
+                self.log_message(str(e))
+            return False
+        return self.is_running
+    
+    def list_playlist(self, url, start=1):
+        """Flat listing straight from yt-dlp (never cached), timed as metadata extraction"""
+        waited = 0.0  # Time spent inside yt-dlp, not in the consumer between entries
+        started = time.monotonic()
+        try:
+            for entry in self.backend.iter_flat_entries(url, lambda: self.is_running, start):
+                waited += time.monotonic() - started
+                yield entry
+                started = time.monotonic()
+            waited += time.monotonic() - started
+        finally:
+            self.telemetry.record_phase('metadata', waited)
+    
+    def download(self, urls, download_path, options, playlist=False, workers=3, sync=False):
+        """Download every video behind urls (with sync, only playlist entries new since the last sync); blocks until done"""
+        self.options = options
+        playlist = playlist or sync
+        if options.audio_only:
+            self.log_message("🎵 Audio-only mode selected")
+        else:
+            self.log_message(f"📺 Video quality: {options.quality}")
+        self._begin(download_path, workers)
+        archive_key = options.archive_key()
+        
+        sync_state = SyncState(download_path) if sync else None
+        scans = []
+        skipped_ids = set()
+        total = 0
+        skipped = 0
+        try:
+            for url in urls:
+                if not self.is_running:
+                    break
+                if playlist:
+                    # Stream entries into the queue while the playlist is still being enumerated
+                    self.log_message(f"🔍 Streaming playlist entries ({workers} parallel worker(s))...")
+                    self.update_progress(5, "Fetching playlist entries...")
+                    entries = self.iter_new_entries(url, sync_state, scans) if sync else self.iter_playlist_entries(url)
+                    for info in entries:
+                        total += 1
+                        if self.archive is not None and self.archive.contains(info.get('id'), archive_key):
+                            skipped += 1
+                            skipped_ids.add(info.get('id'))
+                            continue
+                        in_playlist = bool(info.get('playlist_id') or info.get('playlist'))
+                        self.submit(self.make_job(total, info, download_path, in_playlist), info)
+                else:
+                    self.log_message("🔍 Getting video information...")
+                    self.update_progress(5, "Fetching video details...")
+                    videos = self.get_video_info(url) or []
+                    self.log_message(f"🚀 Starting download with {workers} parallel worker(s)...")
+                    for info in videos:
+                        total += 1
+                        if self.archive is not None and self.archive.contains(info.get('id'), archive_key):
+                            skipped += 1
+                            continue
+                        self.submit(self.make_job(total, info, download_path, False), info)
+        finally:
+            self.scheduler.close()
+        
+        if total:
+            self.log_message(f"📊 Found {total} video(s) to download")
+        if skipped:
+            self.log_message(f"⏭️ Skipping {skipped} video(s) already in the download archive")
+        if self.expected_bytes:
+            self.log_message(f"📦 Expected download size: ~{format_bytes(self.expected_bytes)} "
+                             f"for {self.planned_jobs} video(s) with a format plan")
+        needed = self.expected_bytes + self.estimated_bytes
+        free = free_bytes(self.download_path)
+        if needed and free is not None and free - needed < self.min_free:
+            self.log_message(f"⚠️ Only {format_bytes(free)} free in {self.download_path} for ~{format_bytes(needed)}; "
+                             f"downloads will be held back when space runs low")
+        summary = self._finish(total, skipped)
+        if scans:
+            # Only what is on disk moves the marks; failed and stopped entries are offered again next time
+            finished = skipped_ids | {job.video_id for job in self.scheduler.jobs if job.status == "done"}
+            for key, scan in scans:
+                sync_state.update(key, scan.result(finished))
+            summary.up_to_date = all(scan.complete or scan.reached_mark for key, scan in scans)
+        return summary
+    
+    def resume(self, download_path, workers=3):
+        """Re-run the unfinished jobs recorded in download_path; .part files are continued"""
+        self._begin(download_path, workers)
+        total = skipped = 0
+        try:
+            total, skipped = self.queue_unfinished()
+        finally:
+            self.scheduler.close()
+        return self._finish(total, skipped)
+    
+    def queue_unfinished(self, first_index=1):
+        """Submit the unfinished jobs of the current folder's job store; returns (found, skipped)"""
+        records = self.job_store.unfinished()
+        self.log_message(f"♻️ Resuming {len(records)} unfinished job(s) from a previous session")
+        skipped = 0
+        for index, record in enumerate(records, start=first_index):
+            info = dict(record['info'], webpage_url=record['url'])
+            job = DownloadJob(index, info, record['output_template'], DownloadOptions.from_dict(record['options']))
+            # Finished just before the crash, but the job row was not updated yet
+            if self.archive is not None and self.archive.contains(job.video_id, job.options.archive_key()):
+                self.job_store.set_state(job, "done")
+                skipped += 1
+                continue
+            job.part_path = record['part_path']
+            # The same formats as before, so the .part files still match
+            job.format_plan = FormatPlan.from_dict(record['info'].get('format_plan'))
+            job.attempts = record['attempts']
+            self.submit(job, info)
+        return len(records), skipped
+    
+    def start_session(self, download_path, workers=3):
+        """Keep a scheduler open for jobs submitted over time (used by the daemon)"""
+        self._begin(download_path, workers)
+    
+    def finish_session(self):
+        """Stop accepting jobs and wait for the session's jobs to finish"""
+        self.scheduler.close()
+        return self._finish(len(self.scheduler.jobs), 0)
+    
+    def submit(self, job, info):
+        """Plan the job's formats, persist it, then hand it to the scheduler"""
+        if job.format_plan is None:
+            job.format_plan = self.plan_format(job, info)
+        stored_info = MetadataCache.slim(info)
+        if job.format_plan is not None:
+            stored_info['format_plan'] = job.format_plan.to_dict()
+            if job.format_plan.expected_bytes:
+                self.expected_bytes += job.format_plan.expected_bytes
+                self.planned_jobs += 1
+        else:
+            self.estimated_bytes += typical_size(info.get('duration'), job.options) or 0
+        self.job_store.add(job, stored_info)
+        job.submitted_at = time.monotonic()
+        self.scheduler.submit(job)
+    
+    def plan_format(self, job, info):
+        """Smallest formats meeting the job's quality; cached per video once planned"""
+        if not job.video_id:
+            return None
+        cache_key = f"format:{job.video_id}:{job.options.archive_key()}"
+        cached = self.metadata_cache.get(cache_key)
+        if cached:
+            return FormatPlan.from_dict(cached[0])
+        plan = plan_format(info, job.options, can_merge=self.postprocess_pool.available)
+        if plan is not None:
+            self.metadata_cache.put(cache_key, [plan.to_dict()], slim=False)
+        return plan
+    
+    def _begin(self, download_path, workers):
+        self.is_running = True
+        self.download_path = download_path
+        self.expected_bytes = 0
+        self.planned_jobs = 0
+        self.estimated_bytes = 0
+        self.tuner.workers = workers
+        # One job per video, run concurrently by the scheduler
+        self.scheduler = DownloadScheduler(self.run_job, workers=workers, on_update=self.on_jobs)
+        self.scheduler.start()
+        self.telemetry.start_run(self.backend.name)
+        self.log_message(f"📂 Destination: {download_path}")
+        if self.staging_dir:
+            os.makedirs(self.staging_dir, exist_ok=True)
+            self.log_message(f"🚚 Staging downloads in {self.staging_dir}")
+        self.archive = DownloadArchive(download_path) if self.use_archive else None
+        self.job_store = JobStore(download_path)
+    
+    def _finish(self, total, skipped):
+        self.scheduler.wait()
+        if self.mover.busy:
+            self.log_message("🚚 Waiting for staged files to reach the download folder...")
+            self.mover.join()
+        self.job_store.close()
+        
+        stats = self.metadata_cache.stats()
+        self.log_message(f"🗃️ Metadata cache: {stats['hits']} hit(s), {stats['misses']} miss(es)")
+        
+        summary = DownloadSummary(total, self.scheduler.completed, self.scheduler.failed, not self.is_running, skipped,
+                                  self.scheduler.cancelled)
+        self.is_running = False
+        self.telemetry.finish_run(summary)
+        return summary
+    
+    def make_job(self, index, info, download_path, in_playlist):
+        """Create a download job with its output template (in the staging folder when one is set)"""
+        download_path = self.staging_dir or download_path
+        if in_playlist:
+            playlist = info.get('playlist') or info.get('playlist_title') or 'Playlist'
+            index_width = len(str(info.get('n_entries') or info.get('playlist_count') or index))
+            position = str(info.get('playlist_index') or index).zfill(index_width)
+            output_template = os.path.join(download_path, template_literal(playlist), f'{position} - %(title)s.%(ext)s')
+        else:
+            output_template = os.path.join(download_path, '%(title)s.%(ext)s')
+        return DownloadJob(index, info, output_template, self.options)
+    
+    def run_job(self, job):
+        """Download one video; runs on a scheduler worker thread"""
+        if not self.is_running or not self.admit(job):
+            return False
+        
+        if job.submitted_at is not None:
+            job.timings['queue_wait'] = time.monotonic() - job.submitted_at
+        self.job_store.mark_started(job)
+        job.attempts += 1
+        if job.part_path and os.path.exists(job.part_path):
+            self.log_message(f"♻️ [{job.index}] Continuing {os.path.basename(job.part_path)}")
+        else:
+            self.log_message(f"⬇️ [{job.index}] {job.title}")
+        if job.format_plan is not None and job.format_plan.expected_bytes:
+            self.log_message(f"📦 [{job.index}] Format {job.format_plan.describe()}, "
+                             f"~{format_bytes(job.format_plan.expected_bytes)}")
+        
+        self.governor.job_started(job)
+        job.rate_limit = self.governor.fair_share(self.scheduler.workers)
+        self.choose_fragments(job)
+        # Encode on the process pool instead of inside the download worker, when ffmpeg can be found
+        if job.options.audio_only and self.postprocess_pool.available:
+            job.postprocess = 'mp3'
+        started = time.monotonic()
+        try:
+            success = self.backend.download(
+                job,
+                job.options,
+                on_output=lambda output: self.parse_progress(output, job),
+                on_progress=lambda event: self.handle_progress(job, event),
+                should_continue=lambda: self.is_running and not job.cancelled
+            )
+        finally:
+            self.governor.job_finished(job)
+        job.timings['download'] = time.monotonic() - started
+        
+        if success and job.options.fragments == "auto" and job.splits_download:
+            self.tuner.record(job.fragments, job.downloaded_bytes, job.timings['download'])
+        if job.cancelled:
+            success = False
+        if success and job.postprocess:
+            if job.output_path:
+                return self.start_postprocess(job)
+            self.log_message(f"⚠️ [{job.index}] Downloaded file not reported, skipping {job.postprocess} conversion")
+        return self.complete_job(job, success)
+    
+    def estimate_bytes(self, job):
+        """Disk space the job still needs: its planned size (twice that while merging) less what is on disk"""
+        plan = job.format_plan
+        if plan is not None and plan.expected_bytes:
+            size = plan.expected_bytes * (2 if plan.merged else 1)
+        else:
+            size = typical_size(job.info.get('duration'), job.options) or 0
+        on_disk = job.downloaded_bytes
+        if not on_disk and job.part_path and os.path.exists(job.part_path):
+            on_disk = os.path.getsize(job.part_path)
+        return max(0, size - on_disk)
+    
+    def disk_shortfall(self, needed, staged=0):
+        """(folder, free bytes) of the first disk that can't take needed bytes above the reserve, or None"""
+        checks = [(self.staging_dir or self.download_path, needed)]
+        if self.staging_dir and not same_disk(self.staging_dir, self.download_path):
+            # Everything staged lands in the download folder as well
+            checks.append((self.download_path, needed + staged + self.mover.pending_bytes))
+        for folder, bytes_needed in checks:
+            free = free_bytes(folder)
+            if free is not None and free - bytes_needed < self.min_free:
+                return folder, free
+        return None
+    
+    def admit(self, job):
+        """Hold the job back while the disks it writes to would fall below the free-space reserve"""
+        if not self.min_free:
+            return True
+        waiting = False
+        while self.is_running and not job.cancelled:
+            with self._admission_lock:
+                # Jobs still waiting here have not claimed any space
+                others = [other for other in self.scheduler.active_jobs()
+                          if other is not job and other.phase != "disk space"]
+                needed = self.estimate_bytes(job) + sum(self.estimate_bytes(other) for other in others)
+                shortfall = self.disk_shortfall(needed, sum(other.downloaded_bytes for other in others))
+                if shortfall is None:
+                    job.phase = "download"
+                    if waiting:
+                        self.log_message(f"▶️ [{job.index}] Enough disk space again")
+                    return True
+                job.phase = "disk space"
+            
+            folder, free = shortfall
+            if not others and not self.mover.busy:
+                # Nothing running will free space; stopped jobs can be resumed once space is freed
+                self.log_message(f"❌ Not enough disk space in {folder}: {format_bytes(free)} free, "
+                                 f"~{format_bytes(needed)} needed plus a {format_bytes(self.min_free)} reserve")
+                self.stop()
+                return False
+            if not waiting:
+                waiting = True
+                self.log_message(f"⏸️ [{job.index}] Waiting for disk space ({format_bytes(free)} free in {folder})")
+                self.on_jobs(self.scheduler)
+            time.sleep(ADMISSION_POLL)
+        return False
+    
+    def staged_file_moved(self, job, path, seconds):
+        """Called on the mover thread once a staged file is in the download folder"""
+        job.output_path = path
+        if self.archive is not None:
+            self.archive.add(job.video_id, job.options.archive_key(), path)
+        self.log_message(f"🚚 [{job.index}] Moved to {os.path.dirname(path)} ({seconds:.1f}s)")
+    
+    def staged_move_failed(self, job, error):
+        self.log_message(f"❌ [{job.index}] Could not move {os.path.basename(job.output_path)} "
+                         f"out of the staging folder: {error}")
+    
+    def start_postprocess(self, job):
+        """Queue the job's post-processing; the returned Future resolves once the job is complete"""
+        base = os.path.splitext(job.output_path)[0]
+        target = f"{base}.{job.postprocess}"
+        self.log_message(f"🔧 [{job.index}] Converting to {job.postprocess}: {os.path.basename(job.output_path)}")
+        done = Future()
+        
+        def finished(future):
+            try:
+                job.output_path, job.timings['postprocess'] = future.result()
+                success = True
+            except Exception as e:
+                self.log_message(f"⚠️ [{job.index}] Post-processing failed: {e}")
+                success = False
+            done.set_result(self.complete_job(job, success))
+        
+        if job.output_path == target:
+            # Already converted by an earlier run that stopped before finishing the job
+            done.set_result(self.complete_job(job, True))
+        else:
+            self.postprocess_pool.submit(job.postprocess, job.output_path, target).add_done_callback(finished)
+        return done
+    
+    def complete_job(self, job, success):
+        """Record the job's outcome in the archive, the job store and the telemetry"""
+        started = time.monotonic()
+        if success:
+            if self.staging_dir and job.output_path and is_within(job.output_path, self.staging_dir):
+                destination = os.path.join(self.download_path, os.path.relpath(job.output_path, self.staging_dir))
+                self.mover.submit(job, job.output_path, destination)  # Archived once it has arrived
+            elif self.archive is not None:
+                self.archive.add(job.video_id, job.options.archive_key(), job.output_path)
+            self.job_store.set_state(job, "done")
+            timings = ", ".join(f"{stage} {job.timings[stage]:.1f}s" for stage in ('download', 'postprocess')
+                                if stage in job.timings)
+            self.log_message(f"✅ [{job.index}] Finished: {job.title} ({timings})")
+        elif job.cancelled:
+            # Not offered for resume: the user asked for this job to go away
+            self.job_store.set_state(job, "cancelled")
+        elif self.is_running:
+            self.job_store.set_state(job, "failed")
+            self.log_message(f"❌ [{job.index}] Failed: {job.title}")
+        else:
+            self.job_store.set_state(job, "stopped")
+        job.timings['finalize'] = time.monotonic() - started
+        self.telemetry.record_job(job, "done" if success else "cancelled" if job.cancelled
+                                  else "failed" if self.is_running else "stopped")
+        self.on_job_done(job, success)
+        return success
+    
+    def choose_fragments(self, job):
+        """Pick the job's connection count: tuned, or fixed by the options, within the budget"""
+        name = job.options.external_downloader
+        if name and not find_external_downloader(name):
+            if name not in self._missing_downloaders:
+                self._missing_downloaders.add(name)
+                self.log_message(f"⚠️ {name} not found, using yt-dlp's own downloader")
+            job.options = DownloadOptions.from_dict(dict(job.options.to_dict(), external_downloader=None))
+        if not job.splits_download:
+            job.fragments = 1
+        elif job.options.fragments == "auto":
+            job.fragments = self.tuner.choose()
+        else:
+            job.fragments = max(1, min(int(job.options.fragments), self.tuner.budget))
+    
+    def handle_progress(self, job, event):
+        """Track the job's .part file, apply the bandwidth cap, then update the scheduler"""
+        if event.phase == 'download' and event.downloaded_bytes:
+            job.downloaded_bytes = max(job.downloaded_bytes, event.downloaded_bytes)
+        if event.phase == 'download' and event.status == 'finished' and event.filename:
+            job.output_path = event.filename
+        if event.phase == 'download' and event.speed:
+            job.peak_speed = max(job.peak_speed, event.speed)
+        if event.tmpfilename and event.tmpfilename != job.part_path:
+            job.part_path = event.tmpfilename
+            self.job_store.set_part_path(job, job.part_path)
+        self.scheduler.record_progress(job, event)
+        if self.backend.in_process and event.phase == 'download' and event.downloaded_bytes is not None:
+            self.governor.throttle(job, event.downloaded_bytes)
+    
+    def parse_progress(self, output, job=None):
+        """Log the interesting non-progress lines of yt-dlp output"""
+        try:
+            match = OUTPUT_FILE_RE.match(output)
+            if match and job is not None:
+                job.output_path = match.group('dest') or match.group('merged') or match.group('existing')
+            
+            if output.startswith('[download]'):
+                if 'Destination:' in output:
+                    filename = output.split('Destination: ')[-1]
+                    self.log_message(f"📁 Saving: {os.path.basename(filename)}")
+                elif 'has already been downloaded' in output:
+                    self.log_message("⚠️ File already exists, skipping...")
+                elif 'Downloading' in output and 'playlist' in output:
+                    self.log_message(f"📋 {output}")
+            
+            # Log important messages
+            if IMPORTANT_LINE_RE.search(output):
+                self.log_message(f"⚠️ {output}")
+            elif output.startswith('[info]') and 'Available formats' not in output:
+                self.log_message(f"ℹ️ {output}")
+            elif 'Extracting URL' in output or 'Downloading webpage' in output:
+                self.log_message(f"🔄 {output}")
+                
+        except Exception as e:
+            # If parsing fails, just log the raw output if it's meaningful
+            if output.strip() and len(output.strip()) > 10:
+                self.log_message(output.strip())
@@ -0,0 +1,144 @@
+"""Pick the smallest download that satisfies the requested quality from yt-dlp's format table"""
+import shutil
+
+# Separate video and audio streams are merged into an MP4 without re-encoding, so both must fit that container
+MERGE_VIDEO_EXTS = ('mp4',)
+MERGE_AUDIO_EXTS = ('m4a', 'mp4')
+MIN_AUDIO_ABR = 96  # kbit/s; a smaller audio stream is not worth the lost quality
+
+# Protocols yt-dlp downloads in fragments; only these honour its concurrent fragment setting
+FRAGMENTED_PROTOCOLS = ('m3u8', 'm3u8_native', 'http_dash_segments', 'http_dash_segments_generator', 'f4m', 'ism', 'mhtml')
+
+# Typical YouTube bitrates in kbit/s (video + audio) by height, for entries listed without a format table
+TYPICAL_KBPS = {144: 150, 240: 300, 360: 700, 480: 1200, 720: 2500, 1080: 4500, 1440: 10000, 2160: 20000}
+TYPICAL_AUDIO_KBPS = 130
+
+
+def has_codec(value):
+    return value not in (None, 'none')
+
+
+def estimate_size(fmt, duration=None):
+    """Expected size of a format in bytes (reported, approximate or from its bitrate), or None"""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return int(size)
+    if fmt.get('tbr') and duration:
+        return int(fmt['tbr'] * 125 * duration)  # kbit/s -> bytes
+    return None
+
+
+def typical_size(duration, options):
+    """Rough size in bytes from the duration alone (flat playlist entries have no format table), or None"""
+    if not duration:
+        return None
+    if options.audio_only:
+        kbps = TYPICAL_AUDIO_KBPS
+    elif options.quality == 'worst':
+        kbps = TYPICAL_KBPS[144]
+    elif options.quality == 'best':
+        kbps = TYPICAL_KBPS[2160]
+    else:
+        height = int(options.quality.split('p')[0])
+        kbps = next((TYPICAL_KBPS[h] for h in sorted(TYPICAL_KBPS) if h >= height), TYPICAL_KBPS[2160])
+    return int(kbps * 125 * duration)
+
+
+class FormatPlan:
+    """The formats chosen for one video and their expected total size"""
+    def __init__(self, format_ids, expected_bytes, height=None, fallback=None, protocols=()):
+        self.format_ids = list(format_ids)
+        self.expected_bytes = expected_bytes
+        self.height = height
+        self.fallback = fallback  # Selector used if the planned formats are no longer offered
+        self.protocols = list(protocols)
+    
+    @property
+    def merged(self):
+        return len(self.format_ids) > 1
+    
+    @property
+    def fragmented(self):
+        return any(protocol in FRAGMENTED_PROTOCOLS for protocol in self.protocols)
+    
+    def selector(self):
+        """yt-dlp format selector for the plan"""
+        planned = '+'.join(self.format_ids)
+        return f"{planned}/{self.fallback}" if self.fallback else planned
+    
+    def describe(self):
+        parts = ['+'.join(self.format_ids)]
+        if self.height:
+            parts.append(f"{self.height}p")
+        return ", ".join(parts)
+    
+    def to_dict(self):
+        return {'format_ids': self.format_ids, 'expected_bytes': self.expected_bytes,
+                'height': self.height, 'fallback': self.fallback, 'protocols': self.protocols}
+    
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return None
+        return cls(data['format_ids'], data.get('expected_bytes'), data.get('height'), data.get('fallback'),
+                   data.get('protocols') or ())
+
+
+def plan_format(info, options, can_merge=None):
+    """Plan the download of one video from its 'formats' list; None when there is nothing to plan from"""
+    formats = info.get('formats') or []
+    duration = info.get('duration')
+    sized = [(fmt, estimate_size(fmt, duration)) for fmt in formats if fmt.get('format_id')]
+    sized = [(fmt, size) for fmt, size in sized if size]
+    if not sized:
+        return None
+    if can_merge is None:
+        can_merge = shutil.which('ffmpeg') is not None
+    fallback = options.format_selector()
+
+    audio = [(fmt, size) for fmt, size in sized if has_codec(fmt.get('acodec')) and not has_codec(fmt.get('vcodec'))]
+    if options.audio_only:
+        if not audio:
+            return None
+        # Best bitrate first, then the smallest file
+        fmt, size = min(audio, key=lambda item: (-(item[0].get('abr') or 0), item[1]))
+        return FormatPlan([fmt['format_id']], size, fallback=fallback, protocols=[fmt.get('protocol')])
+
+    video = [(fmt, size) for fmt, size in sized if has_codec(fmt.get('vcodec')) and fmt.get('height')]
+    heights = sorted({fmt['height'] for fmt, size in video})
+    if not heights:
+        return None
+    if options.quality == 'worst':
+        target = heights[0]
+    elif options.quality == 'best':
+        target = heights[-1]
+    else:
+        limit = int(options.quality.split('p')[0])
+        allowed = [height for height in heights if height <= limit]
+        if not allowed:
+            return None
+        target = allowed[-1]
+
+    candidates = []
+    for fmt, size in video:
+        if fmt['height'] == target and has_codec(fmt.get('acodec')):
+            candidates.append(([fmt], size))
+    if can_merge:
+        merge_audio = [(fmt, size) for fmt, size in audio if fmt.get('ext') in MERGE_AUDIO_EXTS]
+        good_audio = [(fmt, size) for fmt, size in merge_audio if (fmt.get('abr') or 0) >= MIN_AUDIO_ABR]
+        if good_audio:
+            best_audio = min(good_audio, key=lambda item: item[1])
+        elif merge_audio:
+            best_audio = max(merge_audio, key=lambda item: item[0].get('abr') or 0)
+        else:
+            best_audio = None
+        if best_audio is not None:
+            for fmt, size in video:
+                if fmt['height'] == target and not has_codec(fmt.get('acodec')) and fmt.get('ext') in MERGE_VIDEO_EXTS:
+                    candidates.append(([fmt, best_audio[0]], size + best_audio[1]))
+    if not candidates:
+        return None
+
+    chosen, size = min(candidates, key=lambda item: item[1])
+    return FormatPlan([fmt['format_id'] for fmt in chosen], size, target, fallback,
+                      [fmt.get('protocol') for fmt in chosen])
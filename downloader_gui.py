@@ -0,0 +1,876 @@
+"""CustomTkinter window; imported only when the GUI is actually opened"""
+import customtkinter as ctk
+import tkinter as tk
+from tkinter import filedialog, messagebox
+import threading
+import os
+import time
+import queue
+
+from downloader_backends import BackendError, format_bytes, format_eta
+from downloader_bandwidth import parse_rate, parse_schedule
+from downloader_engine import DownloadEngine, DownloadOptions, validate_url
+from downloader_jobs import count_unfinished
+from downloader_log import LEVELS, StatusLog, level_matches, message_level
+from downloader_tools import find_tool
+from downloader_tuning import find_external_downloader
+
+# Set appearance mode
+ctk.set_appearance_mode("system")  # Modes: system (default), light, dark
+ctk.set_default_color_theme("blue")  # Themes: blue (default), dark-blue, green
+
+# The Tk thread applies queued UI updates at most this often (~30 frames per second)
+UI_REFRESH_MS = 33
+
+
+class YouTubeDownloader:
+    def __init__(self):
+        self.root = ctk.CTk()
+        self.root.title("Arijit's YT Video Downloader")
+        self.root.geometry("900x750")  # Made taller to ensure all elements are visible
+        self.root.minsize(800, 700)    # Set minimum size to prevent cutting off
+        self.root.resizable(True, True)
+        
+        # Variables
+        self.download_path = tk.StringVar()
+        self.staging_path = tk.StringVar()
+        self.url_var = tk.StringVar()
+        self.format_var = tk.StringVar(value="mp4")
+        self.quality_var = tk.StringVar(value="720p")
+        self.is_playlist = tk.BooleanVar()
+        self.is_sync = tk.BooleanVar()
+        self.is_audio_only = tk.BooleanVar()
+        self.workers_var = tk.StringVar(value="3")
+        self.rate_limit_var = tk.StringVar(value="Unlimited")
+        self.rate_schedule_var = tk.StringVar()
+        self.fragments_var = tk.StringVar(value="auto")
+        self.use_aria2c = tk.BooleanVar()
+        self.use_daemon = tk.BooleanVar()
+        self.selected_job_var = tk.StringVar(value="")
+        self.log_level_var = tk.StringVar(value="all")
+        self.log_search_var = tk.StringVar()
+        
+        # Progress variables
+        self.current_progress = tk.DoubleVar()
+        self.total_videos = tk.IntVar()
+        self.current_video = tk.IntVar()
+        
+        # Download state
+        self.is_downloading = False
+        self.download_thread = None  # Set until the run's thread has finished, even after STOP
+        self.engine = DownloadEngine(
+            on_log=self.log_message,
+            on_progress=self.update_progress,
+            on_jobs=self.refresh_job_progress
+        )
+        self.daemon_client = None  # Set by find_daemon once a daemon answers
+        
+        # Worker threads never touch widgets; they queue updates for the Tk thread
+        self.ui_queue = queue.Queue()
+        self._pending_jobs_view = None
+        
+        # The widget only holds recent lines; the full history goes to rotating log files
+        self.status_log = StatusLog()
+        self._log_view_lines = 0
+        
+        self.setup_ui()
+        self.root.after(UI_REFRESH_MS, self.process_ui_queue)
+        
+    def check_dependencies(self):
+        """Check for yt-dlp and ffmpeg on a background thread, so the window is usable right away"""
+        def check():
+            try:
+                version = self.engine.backend_version()  # Also imports yt_dlp for the in-process engine
+            except BackendError:
+                self.call_in_ui(
+                    messagebox.showwarning,
+                    "Missing Dependency",
+                    "yt-dlp is not installed. Please install it using:\npip install yt-dlp"
+                )
+                return
+            ffmpeg = find_tool('ffmpeg')
+            self.log_message(f"⚙️ yt-dlp {version} ({self.engine.backend.name} engine), "
+                             + (f"ffmpeg {ffmpeg[1]}" if ffmpeg else "ffmpeg not found (needed for MP3 and merged formats)"))
+        
+        threading.Thread(target=check, daemon=True).start()
+    
+    def setup_ui(self):
+        # Create scrollable main frame to ensure all content is accessible
+        main_container = ctk.CTkScrollableFrame(self.root)
+        main_container.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        # Title
+        title_label = ctk.CTkLabel(
+            main_container, 
+            text="🎥 Arijit's YT Video Downloader", 
+            font=ctk.CTkFont(size=28, weight="bold")
+        )
+        title_label.pack(pady=(0, 30))
+        
+        # URL Input Section
+        url_frame = ctk.CTkFrame(main_container)
+        url_frame.pack(fill="x", padx=10, pady=10)
+        
+        ctk.CTkLabel(url_frame, text="YouTube URL:", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(15, 5))
+        
+        self.url_entry = ctk.CTkEntry(
+            url_frame, 
+            textvariable=self.url_var,
+            placeholder_text="Enter YouTube video or playlist URL here...",
+            height=45,
+            font=ctk.CTkFont(size=14)
+        )
+        self.url_entry.pack(fill="x", padx=20, pady=(0, 15))
+        
+        # Options Section
+        options_frame = ctk.CTkFrame(main_container)
+        options_frame.pack(fill="x", padx=10, pady=10)
+        
+        ctk.CTkLabel(options_frame, text="Download Options:", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(15, 5))
+        
+        # Format and Quality Selection
+        format_frame = ctk.CTkFrame(options_frame)
+        format_frame.pack(fill="x", padx=20, pady=10)
+        
+        # Audio Only Checkbox
+        self.audio_checkbox = ctk.CTkCheckBox(
+            format_frame, 
+            text="Audio Only (MP3)", 
+            variable=self.is_audio_only,
+            command=self.toggle_audio_mode,
+            font=ctk.CTkFont(size=14)
+        )
+        self.audio_checkbox.pack(side="left", padx=20, pady=15)
+        
+        # Playlist Checkbox
+        self.playlist_checkbox = ctk.CTkCheckBox(
+            format_frame, 
+            text="Playlist Mode", 
+            variable=self.is_playlist,
+            font=ctk.CTkFont(size=14)
+        )
+        self.playlist_checkbox.pack(side="left", padx=30, pady=15)
+        
+        # Sync only fetches what was added since the folder's last sync of the playlist
+        self.sync_checkbox = ctk.CTkCheckBox(
+            format_frame,
+            text="Sync (new only)",
+            variable=self.is_sync,
+            font=ctk.CTkFont(size=14)
+        )
+        self.sync_checkbox.pack(side="left", padx=10, pady=15)
+        
+        # Quality Selection
+        quality_frame = ctk.CTkFrame(options_frame)
+        quality_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        ctk.CTkLabel(quality_frame, text="Quality:", font=ctk.CTkFont(size=14)).pack(side="left", padx=20, pady=15)
+        
+        self.quality_menu = ctk.CTkOptionMenu(
+            quality_frame,
+            variable=self.quality_var,
+            values=["2160p (4K)", "1440p (2K)", "1080p (Full HD)", "720p (HD)", "480p", "360p", "240p", "best", "worst"],
+            font=ctk.CTkFont(size=12),
+            width=150
+        )
+        self.quality_menu.pack(side="left", padx=15, pady=15)
+        
+        # Parallel downloads (playlist entries are fetched concurrently)
+        ctk.CTkLabel(quality_frame, text="Parallel Downloads:", font=ctk.CTkFont(size=14)).pack(side="left", padx=(30, 10), pady=15)
+        
+        self.workers_menu = ctk.CTkOptionMenu(
+            quality_frame,
+            variable=self.workers_var,
+            values=[str(n) for n in range(1, 9)],
+            font=ctk.CTkFont(size=12),
+            width=70
+        )
+        self.workers_menu.pack(side="left", padx=5, pady=15)
+        
+        # Bandwidth limit shared by all parallel downloads
+        bandwidth_frame = ctk.CTkFrame(options_frame)
+        bandwidth_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        ctk.CTkLabel(bandwidth_frame, text="Bandwidth Limit:", font=ctk.CTkFont(size=14)).pack(side="left", padx=20, pady=15)
+        
+        self.rate_limit_menu = ctk.CTkOptionMenu(
+            bandwidth_frame,
+            variable=self.rate_limit_var,
+            values=["Unlimited", "512K", "1M", "2M", "5M", "10M", "20M"],
+            font=ctk.CTkFont(size=12),
+            width=110
+        )
+        self.rate_limit_menu.pack(side="left", padx=15, pady=15)
+        
+        self.rate_schedule_entry = ctk.CTkEntry(
+            bandwidth_frame,
+            textvariable=self.rate_schedule_var,
+            placeholder_text="Schedule, e.g. 09:00-18:00=1M",
+            height=32,
+            font=ctk.CTkFont(size=12)
+        )
+        self.rate_schedule_entry.pack(side="left", fill="x", expand=True, padx=(15, 20), pady=15)
+        
+        # Segmented downloads: concurrent fragments per video, or a multi-connection external downloader
+        segments_frame = ctk.CTkFrame(options_frame)
+        segments_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        ctk.CTkLabel(segments_frame, text="Connections per Video:", font=ctk.CTkFont(size=14)).pack(side="left", padx=20, pady=15)
+        
+        self.fragments_menu = ctk.CTkOptionMenu(
+            segments_frame,
+            variable=self.fragments_var,
+            values=["auto", "1", "2", "4", "8", "16"],
+            font=ctk.CTkFont(size=12),
+            width=90
+        )
+        self.fragments_menu.pack(side="left", padx=15, pady=15)
+        
+        self.aria2c_checkbox = ctk.CTkCheckBox(
+            segments_frame,
+            text="Use aria2c",
+            variable=self.use_aria2c,
+            font=ctk.CTkFont(size=14)
+        )
+        self.aria2c_checkbox.pack(side="left", padx=30, pady=15)
+        if not find_external_downloader("aria2c"):
+            self.aria2c_checkbox.configure(state="disabled", text="Use aria2c (not installed)")
+        
+        # Enabled once a shared download daemon answers (see find_daemon)
+        self.daemon_checkbox = ctk.CTkCheckBox(
+            segments_frame,
+            text="Use shared daemon (not running)",
+            variable=self.use_daemon,
+            state="disabled",
+            font=ctk.CTkFont(size=14)
+        )
+        self.daemon_checkbox.pack(side="left", padx=10, pady=15)
+        
+        # Download Path Section
+        path_frame = ctk.CTkFrame(main_container)
+        path_frame.pack(fill="x", padx=10, pady=10)
+        
+        ctk.CTkLabel(path_frame, text="Download Location:", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(15, 5))
+        
+        path_input_frame = ctk.CTkFrame(path_frame)
+        path_input_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        self.path_entry = ctk.CTkEntry(
+            path_input_frame,
+            textvariable=self.download_path,
+            placeholder_text="Select download folder...",
+            height=40,
+            font=ctk.CTkFont(size=12)
+        )
+        self.path_entry.pack(side="left", fill="x", expand=True, padx=(15, 10), pady=12)
+        
+        browse_btn = ctk.CTkButton(
+            path_input_frame,
+            text="📁 Browse",
+            width=100,
+            height=40,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            command=self.browse_folder
+        )
+        browse_btn.pack(side="right", padx=(5, 15), pady=12)
+        
+        # Optional fast local folder; finished files are moved to the download location in the background
+        staging_input_frame = ctk.CTkFrame(path_frame)
+        staging_input_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        self.staging_entry = ctk.CTkEntry(
+            staging_input_frame,
+            textvariable=self.staging_path,
+            placeholder_text="Staging folder on fast local storage (optional)...",
+            height=32,
+            font=ctk.CTkFont(size=12)
+        )
+        self.staging_entry.pack(side="left", fill="x", expand=True, padx=(15, 10), pady=8)
+        
+        ctk.CTkButton(
+            staging_input_frame,
+            text="📁 Staging",
+            width=100,
+            height=32,
+            font=ctk.CTkFont(size=12),
+            command=self.browse_staging_folder
+        ).pack(side="right", padx=(5, 15), pady=8)
+        
+        # Progress Section
+        progress_frame = ctk.CTkFrame(main_container)
+        progress_frame.pack(fill="x", padx=10, pady=10)
+        
+        ctk.CTkLabel(progress_frame, text="Download Progress:", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(15, 5))
+        
+        self.progress_bar = ctk.CTkProgressBar(progress_frame, height=25)
+        self.progress_bar.pack(fill="x", padx=20, pady=(0, 10))
+        self.progress_bar.set(0)
+        
+        self.progress_label = ctk.CTkLabel(progress_frame, text="Ready to download", font=ctk.CTkFont(size=14))
+        self.progress_label.pack(padx=20, pady=(0, 5))
+        
+        # Per-job progress (one line per active download)
+        self.jobs_label = ctk.CTkLabel(progress_frame, text="", font=ctk.CTkFont(size=12), justify="left")
+        self.jobs_label.pack(anchor="w", padx=20, pady=(0, 5))
+        
+        # Pause, resume or cancel a single job while the others keep downloading
+        job_control_frame = ctk.CTkFrame(progress_frame, fg_color="transparent")
+        job_control_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        self.job_menu = ctk.CTkOptionMenu(
+            job_control_frame,
+            variable=self.selected_job_var,
+            values=[""],
+            font=ctk.CTkFont(size=12),
+            width=320
+        )
+        self.job_menu.pack(side="left")
+        self._job_choices = []
+        
+        for text, command in (("⏸️ Pause", self.pause_selected_job),
+                              ("▶️ Resume", self.resume_selected_job),
+                              ("✖️ Cancel", self.cancel_selected_job)):
+            ctk.CTkButton(
+                job_control_frame,
+                text=text,
+                height=28,
+                width=90,
+                font=ctk.CTkFont(size=12),
+                command=command
+            ).pack(side="left", padx=(10, 0))
+        
+        # Status Text Area
+        status_frame = ctk.CTkFrame(main_container)
+        status_frame.pack(fill="x", padx=10, pady=10)
+        
+        ctk.CTkLabel(status_frame, text="Status Log:", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(15, 5))
+        
+        # Level filter and search over the log
+        log_filter_frame = ctk.CTkFrame(status_frame, fg_color="transparent")
+        log_filter_frame.pack(fill="x", padx=20, pady=(0, 5))
+        
+        ctk.CTkLabel(log_filter_frame, text="Show:", font=ctk.CTkFont(size=12)).pack(side="left")
+        
+        self.log_level_menu = ctk.CTkOptionMenu(
+            log_filter_frame,
+            variable=self.log_level_var,
+            values=list(LEVELS),
+            command=lambda choice: self.render_log(),
+            font=ctk.CTkFont(size=12),
+            width=100
+        )
+        self.log_level_menu.pack(side="left", padx=10)
+        
+        self.log_search_entry = ctk.CTkEntry(
+            log_filter_frame,
+            textvariable=self.log_search_var,
+            placeholder_text="Filter log...",
+            height=28,
+            font=ctk.CTkFont(size=12)
+        )
+        self.log_search_entry.pack(side="left", fill="x", expand=True, padx=10)
+        self.log_search_entry.bind("<KeyRelease>", lambda event: self.render_log())
+        
+        ctk.CTkButton(
+            log_filter_frame,
+            text="🔎 Search History",
+            height=28,
+            width=130,
+            font=ctk.CTkFont(size=12),
+            command=self.search_log_history
+        ).pack(side="left")
+        
+        self.status_text = ctk.CTkTextbox(status_frame, height=140, font=ctk.CTkFont(size=11))
+        self.status_text.pack(fill="x", padx=20, pady=(0, 15))
+        
+        # CONTROL BUTTONS SECTION - MOST IMPORTANT
+        button_frame = ctk.CTkFrame(main_container)
+        button_frame.pack(fill="x", padx=10, pady=20)
+        
+        ctk.CTkLabel(button_frame, text="Controls:", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", padx=20, pady=(15, 10))
+        
+        # Create a centered container for buttons
+        buttons_container = ctk.CTkFrame(button_frame)
+        buttons_container.pack(pady=(0, 20))
+        
+        # Make buttons large and prominent
+        self.download_btn = ctk.CTkButton(
+            buttons_container,
+            text="📥 START DOWNLOAD",
+            height=55,
+            width=220,
+            font=ctk.CTkFont(size=18, weight="bold"),
+            fg_color="#28a745",  # Green color
+            hover_color="#218838",
+            command=self.start_download
+        )
+        self.download_btn.pack(side="left", padx=20, pady=15)
+        
+        self.stop_btn = ctk.CTkButton(
+            buttons_container,
+            text="⏹️ STOP",
+            height=55,
+            width=120,
+            font=ctk.CTkFont(size=16, weight="bold"),
+            fg_color="#dc3545",  # Red color
+            hover_color="#c82333",
+            command=self.stop_download,
+            state="disabled"
+        )
+        self.stop_btn.pack(side="left", padx=15, pady=15)
+        
+        self.clear_btn = ctk.CTkButton(
+            buttons_container,
+            text="🗑️ CLEAR",
+            height=55,
+            width=120,
+            font=ctk.CTkFont(size=16, weight="bold"),
+            fg_color="#6c757d",  # Gray color
+            hover_color="#5a6268",
+            command=self.clear_all
+        )
+        self.clear_btn.pack(side="left", padx=15, pady=15)
+        
+        # Add extra space at bottom to ensure buttons are always visible
+        ctk.CTkLabel(main_container, text="", height=30).pack()
+        
+        # Set default download path
+        self.download_path.set(os.path.join(os.path.expanduser("~"), "Downloads"))
+    
+    def toggle_audio_mode(self):
+        """Toggle between audio and video mode"""
+        if self.is_audio_only.get():
+            self.quality_var.set("best")
+            self.quality_menu.configure(state="disabled")
+        else:
+            self.quality_menu.configure(state="normal")
+    
+    def browse_folder(self):
+        """Open folder browser dialog"""
+        folder = filedialog.askdirectory(initialdir=self.download_path.get())
+        if folder:
+            self.download_path.set(folder)
+            self.offer_resume()
+    
+    def browse_staging_folder(self):
+        """Pick the staging folder"""
+        folder = filedialog.askdirectory(initialdir=self.staging_path.get() or self.download_path.get())
+        if folder:
+            self.staging_path.set(folder)
+    
+    def offer_resume(self):
+        """Ask to resume jobs left unfinished in the download folder by a previous session"""
+        folder = self.download_path.get()
+        if self.download_thread is not None or not folder or not os.path.isdir(folder):
+            return
+        count = count_unfinished(folder)
+        if count:
+            self.log_message(f"♻️ Found {count} unfinished download(s) from a previous session")
+            if messagebox.askyesno("Resume Downloads", f"{count} download(s) in this folder did not finish last time.\n\nResume them now?"):
+                self.start_download(resume=True)
+    
+    def log_message(self, message):
+        """Add message to status text area (safe to call from any thread)"""
+        timestamp = time.strftime('%H:%M:%S')
+        self.ui_queue.put(('log', message_level(message), f"[{timestamp}] {message}"))
+    
+    def update_progress(self, percent, message=""):
+        """Update progress bar and label (safe to call from any thread)"""
+        self.ui_queue.put(('progress', percent, message))
+    
+    def call_in_ui(self, func, *args):
+        """Run func on the Tk thread (dialogs, widget state changes)"""
+        self.ui_queue.put(('call', func, args))
+    
+    def process_ui_queue(self):
+        """Apply queued updates in one batch; progress updates collapse to the latest"""
+        log_lines = []
+        progress = None
+        progress_message = ""
+        calls = []
+        while True:
+            try:
+                event = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == 'log':
+                log_lines.append(event[1:])
+            elif event[0] == 'progress':
+                progress = event[1]
+                progress_message = event[2] or progress_message
+            elif event[0] == 'call':
+                calls.append(event[1:])
+        
+        if log_lines:
+            self.status_log.append(log_lines)
+            self.show_log_lines([line for level, line in log_lines if self.log_filter_matches(level, line)])
+        
+        scheduler, self._pending_jobs_view = self._pending_jobs_view, None
+        if scheduler is not None:
+            self.show_job_progress(scheduler)
+        # Explicit progress updates (start, finish, stop) win over the job view
+        if progress is not None:
+            self.progress_bar.set(progress / 100)
+            if progress_message:
+                self.progress_label.configure(text=progress_message)
+        
+        # Reschedule before running calls: dialogs block until dismissed
+        self.root.after(UI_REFRESH_MS, self.process_ui_queue)
+        for func, args in calls:
+            func(*args)
+    
+    def log_filter_matches(self, level, line):
+        text = self.log_search_var.get().strip().lower()
+        return level_matches(level, self.log_level_var.get()) and (not text or text in line.lower())
+    
+    def show_log_lines(self, lines):
+        """Append lines to the status widget, dropping the oldest beyond the in-memory limit"""
+        if not lines:
+            return
+        self.status_text.insert("end", "\n".join(lines) + "\n")
+        self._log_view_lines += len(lines)
+        excess = self._log_view_lines - self.status_log.lines.maxlen
+        if excess > 0:
+            self.status_text.delete("1.0", f"{excess + 1}.0")
+            self._log_view_lines -= excess
+        self.status_text.see("end")
+    
+    def render_log(self):
+        """Redraw the status widget from the recent lines that pass the filter"""
+        self.status_text.delete("1.0", "end")
+        self._log_view_lines = 0
+        self.show_log_lines(self.status_log.recent(self.log_level_var.get(), self.log_search_var.get().strip()))
+    
+    def search_log_history(self):
+        """Search the on-disk log history (older than the widget keeps) in the background"""
+        text = self.log_search_var.get().strip()
+        level = self.log_level_var.get()
+        
+        def search():
+            lines = self.status_log.search_history(text, level)
+            self.call_in_ui(self.show_log_history, text, lines)
+        
+        threading.Thread(target=search, daemon=True).start()
+    
+    def show_log_history(self, text, lines):
+        self.status_text.delete("1.0", "end")
+        self._log_view_lines = 0
+        self.show_log_lines([f"🔎 {len(lines)} matching line(s) in {self.status_log.path}"
+                             + (f" for '{text}'" if text else "")] + lines)
+    
+    def clear_log(self):
+        """Empty the status widget (the log files keep the history)"""
+        self.status_log.clear()
+        self.status_text.delete("1.0", "end")
+        self._log_view_lines = 0
+    
+    def validate_url(self, url):
+        """Validate YouTube URL"""
+        return validate_url(url)
+    
+    def download_video(self, use_daemon=False):
+        """Download video in separate thread"""
+        url = self.url_var.get().strip()
+        download_path = self.download_path.get()
+        
+        try:
+            if not url:
+                self.call_in_ui(messagebox.showerror, "Error", "Please enter a YouTube URL")
+                return
+            
+            if not download_path or not os.path.exists(download_path):
+                self.call_in_ui(messagebox.showerror, "Error", "Please select a valid download folder")
+                return
+            
+            if not self.validate_url(url):
+                self.call_in_ui(messagebox.showerror, "Error", "Please enter a valid YouTube URL")
+                return
+            
+            options = DownloadOptions(
+                self.is_audio_only.get(),
+                self.quality_var.get(),
+                fragments=self.fragments_var.get(),
+                external_downloader="aria2c" if self.use_aria2c.get() else None
+            )
+            if use_daemon:
+                summary = self.daemon_client.download(
+                    [url],
+                    download_path,
+                    options,
+                    playlist=self.is_playlist.get(),
+                    on_log=self.log_message,
+                    on_progress=self.update_progress,
+                    should_continue=lambda: self.is_downloading
+                )
+            else:
+                summary = self.engine.download(
+                    [url],
+                    download_path,
+                    options,
+                    playlist=self.is_playlist.get(),
+                    workers=int(self.workers_var.get()),
+                    sync=self.is_sync.get()
+                )
+            self.report_summary(summary)
+            
+        except Exception as e:
+            self.log_message(f"❌ Error: {str(e)}")
+            self.call_in_ui(messagebox.showerror, "Error", f"An error occurred: {str(e)}")
+        
+        finally:
+            self.call_in_ui(self.download_finished)
+    
+    def find_daemon(self):
+        """Offer the shared download daemon when one is running (checked off the Tk thread)"""
+        def check():
+            # Imported here: the HTTP modules it needs aren't worth loading before the window opens
+            from downloader_daemon import DaemonClient
+            client = DaemonClient()
+            if client.available():
+                self.daemon_client = client
+                self.call_in_ui(self.daemon_found)
+        
+        threading.Thread(target=check, daemon=True).start()
+    
+    def daemon_found(self):
+        self.daemon_checkbox.configure(state="normal", text="Use shared daemon")
+        ignored = self.local_only_settings()
+        if ignored:
+            self.log_message(f"🛰️ Shared download daemon found at {self.daemon_client.url}; not selected because it "
+                             f"would ignore your {', '.join(ignored)}")
+            return
+        self.use_daemon.set(True)
+        self.log_message(f"🛰️ Shared download daemon found at {self.daemon_client.url}; identical downloads are fetched once")
+    
+    def local_only_settings(self):
+        """Settings the shared daemon replaces with its own (connections and aria2c are passed on)"""
+        ignored = []
+        if self.rate_limit_var.get() != "Unlimited" or self.rate_schedule_var.get().strip():
+            ignored.append("bandwidth limit")
+        if self.staging_path.get().strip():
+            ignored.append("staging folder")
+        if self.workers_var.get() != "3":
+            ignored.append("parallel downloads")
+        return ignored
+    
+    def resume_downloads(self):
+        """Resume unfinished jobs in separate thread"""
+        try:
+            summary = self.engine.resume(self.download_path.get(), workers=int(self.workers_var.get()))
+            self.report_summary(summary)
+        except Exception as e:
+            self.log_message(f"❌ Error: {str(e)}")
+            self.call_in_ui(messagebox.showerror, "Error", f"An error occurred: {str(e)}")
+        finally:
+            self.call_in_ui(self.download_finished)
+    
+    def report_summary(self, summary):
+        """Log and show the outcome of a download run"""
+        self.call_in_ui(self.total_videos.set, summary.total)
+        
+        # Summarize results
+        if summary.stopped:
+            self.log_message(f"⏹️ Download stopped by user ({summary.completed} of {summary.total} completed)")
+        elif not summary.total and summary.up_to_date:
+            self.update_progress(100, "Already up to date")
+            self.log_message("✅ Nothing new since the last sync")
+        elif not summary.total:
+            self.log_message("❌ No videos found for this URL")
+            self.call_in_ui(messagebox.showerror, "Error", "Could not get any video information. Check the status log for details.")
+        elif summary.failed == 0 and summary.skipped == summary.total:
+            self.update_progress(100, "Everything is already downloaded")
+            self.log_message(f"✅ All {summary.total} video(s) were already downloaded")
+            self.call_in_ui(messagebox.showinfo, "Up to date", "All videos were already downloaded.")
+        elif summary.failed == 0:
+            self.update_progress(100, "Download completed successfully!")
+            if summary.cancelled:
+                self.log_message(f"⏹️ {summary.cancelled} download(s) cancelled")
+            self.log_message("✅ Download completed successfully!")
+            self.call_in_ui(messagebox.showinfo, "Success", "Download completed successfully!")
+        else:
+            self.update_progress(100, f"Finished with {summary.failed} failed download(s)")
+            self.log_message(f"❌ {summary.failed} of {summary.total} download(s) failed")
+            self.call_in_ui(messagebox.showerror, "Error", f"{summary.failed} download(s) failed. Check the status log for details.")
+    
+    def refresh_job_progress(self, scheduler):
+        """Mark the job view dirty; it is redrawn on the next UI tick"""
+        self._pending_jobs_view = scheduler
+    
+    def show_job_progress(self, scheduler):
+        """Show aggregate progress plus one line per active job"""
+        finished = scheduler.completed + scheduler.failed + scheduler.cancelled
+        total = len(scheduler.jobs)
+        self.progress_bar.set(scheduler.aggregate_progress() / 100)
+        status = f"Downloaded {finished} of {total} video(s)"
+        throughput = scheduler.throughput()
+        if throughput:
+            status += f" • {format_bytes(throughput)}/s"
+            limit = self.engine.governor.current_limit()
+            if limit:
+                status += f" (limit {format_bytes(limit)}/s)"
+        self.progress_label.configure(text=status)
+        
+        lines = []
+        choices = []
+        for job in scheduler.active_jobs():
+            title = job.title if len(job.title) <= 45 else job.title[:42] + "..."
+            if job.status == "downloading":
+                choices.append(f"[{job.index}] {title}")
+            if job.paused:
+                lines.append(f"⏸️ [{job.index}] {title} — paused at {job.percent:.1f}%")
+            elif job.phase == 'disk space':
+                lines.append(f"💾 [{job.index}] {title} — waiting for disk space")
+            elif job.phase == 'postprocess':
+                lines.append(f"🔧 [{job.index}] {title} — processing")
+            elif job.speed:
+                lines.append(f"⬇️ [{job.index}] {title} — {job.percent:.1f}% • {format_bytes(job.speed)}/s • ETA {format_eta(job.eta)}")
+            else:
+                lines.append(f"⬇️ [{job.index}] {title} — {job.percent:.1f}%")
+        self.jobs_label.configure(text="\n".join(lines))
+        self.set_job_choices(choices)
+    
+    def set_job_choices(self, choices):
+        """Offer the running jobs in the job control menu"""
+        if choices == self._job_choices:
+            return
+        self._job_choices = choices
+        self.job_menu.configure(values=choices or [""])
+        if self.selected_job_var.get() not in choices:
+            self.selected_job_var.set(choices[0] if choices else "")
+    
+    def selected_job(self):
+        """The job picked in the job control menu, or None"""
+        choice = self.selected_job_var.get()
+        if not choice.startswith("["):
+            return None
+        return self.engine.find_job(int(choice[1:choice.index("]")]))
+    
+    def pause_selected_job(self):
+        job = self.selected_job()
+        if job is None:
+            return
+        if not self.engine.backend.can_pause:
+            self.log_message("⚠️ Pausing single downloads is not supported by this yt-dlp engine on this system")
+        elif not self.engine.pause_job(job):
+            self.log_message(f"⚠️ [{job.index}] Only running downloads can be paused")
+    
+    def resume_selected_job(self):
+        job = self.selected_job()
+        if job is not None:
+            self.engine.resume_job(job)
+    
+    def cancel_selected_job(self):
+        job = self.selected_job()
+        if job is not None:
+            self.engine.cancel_job(job)
+    
+    def start_download(self, resume=False):
+        """Start download process (or resume the folder's unfinished jobs)"""
+        if self.download_thread is not None:
+            return  # The previous run is still running or winding down after STOP
+        
+        # The daemon keeps no sync marks, so syncs always run in this window
+        use_daemon = self.use_daemon.get() and not resume and not self.is_sync.get()
+        ignored = self.local_only_settings() if use_daemon else []
+        if ignored and not messagebox.askyesno(
+                "Shared Daemon",
+                f"The shared daemon downloads with its own settings, so your {', '.join(ignored)} would be ignored.\n\n"
+                "Use the daemon anyway? Choose No to download in this window with your settings."):
+            use_daemon = False
+        
+        # Check dependencies first (the shared daemon runs yt-dlp itself)
+        try:
+            version = None if use_daemon else self.engine.backend_version()
+        except BackendError:
+            messagebox.showerror("Error", "yt-dlp is not installed.\n\nPlease install it using:\npip install yt-dlp")
+            return
+        
+        staging = self.staging_path.get().strip()
+        if staging and not os.path.isdir(staging):
+            messagebox.showerror("Error", "The staging folder does not exist")
+            return
+        self.engine.staging_dir = staging or None
+        
+        try:
+            self.engine.governor.configure(
+                parse_rate(self.rate_limit_var.get()),
+                parse_schedule(self.rate_schedule_var.get())
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        self.is_downloading = True
+        self.download_btn.configure(state="disabled", text="⏳ DOWNLOADING...")
+        self.stop_btn.configure(state="normal")
+        
+        # Clear previous status
+        self.clear_log()
+        self.update_progress(0, "Initializing download...")
+        if not use_daemon:
+            self.log_message(f"⚙️ Using {self.engine.backend.name} yt-dlp engine (version {version})")
+        
+        # Start download thread
+        if resume:
+            self.download_thread = threading.Thread(target=self.resume_downloads, daemon=True)
+        else:
+            self.download_thread = threading.Thread(target=self.download_video, args=(use_daemon,), daemon=True)
+        self.download_thread.start()
+    
+    def stop_download(self):
+        """Stop download process"""
+        if not self.is_downloading:
+            return
+        
+        self.is_downloading = False
+        self.log_message("🛑 Stopping download...")
+        self.update_progress(0, "Download stopped")
+        
+        # Each job ends its own yt-dlp process (and children); other yt-dlp instances are left alone
+        self.engine.stop()
+        
+        # START stays disabled until the download thread has wound the run down and calls download_finished
+        self.download_btn.configure(state="disabled", text="⏳ STOPPING...")
+        self.stop_btn.configure(state="disabled")
+    
+    def download_finished(self):
+        """Reset UI after download completion"""
+        self.is_downloading = False
+        self.download_thread = None
+        self.download_btn.configure(state="normal", text="📥 START DOWNLOAD")
+        self.stop_btn.configure(state="disabled")
+        self.jobs_label.configure(text="")
+        self.set_job_choices([])
+    
+    def clear_all(self):
+        """Clear all inputs and status"""
+        if self.is_downloading:
+            if messagebox.askyesno("Confirm", "Download is in progress. Stop and clear?"):
+                self.stop_download()
+            else:
+                return
+        
+        self.url_var.set("")
+        self.clear_log()
+        self.update_progress(0, "Ready to download")
+        self.is_playlist.set(False)
+        self.is_sync.set(False)
+        self.is_audio_only.set(False)
+        self.quality_var.set("720p (HD)")
+        self.toggle_audio_mode()
+        self.log_message("🔄 Interface cleared and ready for new download")
+    
+    def run(self):
+        """Start the application"""
+        # Add a welcome message
+        self.log_message("🎉 Welcome to YouTube Downloader Pro!")
+        self.log_message("📝 Enter a YouTube URL and click 'START DOWNLOAD' to begin")
+        self.log_message("💡 Tip: Enable 'Playlist Mode' for downloading entire playlists")
+        self.log_message("💡 Tip: 'Sync (new only)' fetches just the videos added since the last sync into this folder")
+        self.check_dependencies()
+        self.root.after(200, self.offer_resume)
+        self.root.after(300, self.find_daemon)
+        
+        self.root.mainloop()
+        self.engine.close()
+        self.status_log.close()
@@ -0,0 +1,118 @@
+"""Crash-safe job queue: one SQLite row per video, kept in the download folder"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+JOBS_FILENAME = ".ytdl-jobs.sqlite3"
+
+# Failed jobs are retried on resume until they have been attempted this often
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_key TEXT NOT NULL,
+    format_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    info TEXT NOT NULL,
+    options TEXT NOT NULL,
+    output_template TEXT NOT NULL,
+    state TEXT NOT NULL,
+    part_path TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (job_key, format_key)
+)
+"""
+
+
+class JobStore:
+    """Durable state of every job scheduled into one download folder"""
+    def __init__(self, folder):
+        self.path = os.path.join(folder, JOBS_FILENAME)
+        self._lock = threading.Lock()
+        # Shared by the worker threads; every access goes through self._lock
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+    
+    @staticmethod
+    def key(job):
+        return job.video_id or job.url
+    
+    def add(self, job, info):
+        """Record a newly scheduled job (re-queues an existing record for the same video and format)"""
+        now = time.time()
+        self._execute(
+            """INSERT INTO jobs (job_key, format_key, url, title, info, options, output_template,
+                                 state, attempts, created, updated)
+               VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', 0, ?, ?)
+               ON CONFLICT (job_key, format_key) DO UPDATE SET
+                   state = 'queued', output_template = excluded.output_template, updated = excluded.updated""",
+            (self.key(job), job.options.archive_key(), job.url, job.title, json.dumps(info),
+             json.dumps(job.options.to_dict()), job.output_template, now, now)
+        )
+    
+    def mark_started(self, job):
+        self._execute(
+            "UPDATE jobs SET state = 'downloading', attempts = attempts + 1, updated = ? "
+            "WHERE job_key = ? AND format_key = ?",
+            (time.time(), self.key(job), job.options.archive_key())
+        )
+    
+    def set_part_path(self, job, part_path):
+        self._execute(
+            "UPDATE jobs SET part_path = ?, updated = ? WHERE job_key = ? AND format_key = ?",
+            (part_path, time.time(), self.key(job), job.options.archive_key())
+        )
+    
+    def set_state(self, job, state):
+        self._execute(
+            "UPDATE jobs SET state = ?, updated = ? WHERE job_key = ? AND format_key = ?",
+            (state, time.time(), self.key(job), job.options.archive_key())
+        )
+    
+    def unfinished(self):
+        """Rows of jobs to resume: interrupted, never started, stopped, or failed with attempts left"""
+        with self._lock:
+            cursor = self._db.execute(
+                """SELECT url, info, options, output_template, part_path, attempts FROM jobs
+                   WHERE state IN ('queued', 'downloading', 'stopped')
+                      OR (state = 'failed' AND attempts < ?)
+                   ORDER BY created""",
+                (MAX_ATTEMPTS,)
+            )
+            rows = cursor.fetchall()
+        return [
+            {'url': url, 'info': json.loads(info), 'options': json.loads(options),
+             'output_template': output_template, 'part_path': part_path, 'attempts': attempts}
+            for url, info, options, output_template, part_path, attempts in rows
+        ]
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+    
+    def _execute(self, sql, params):
+        with self._lock:
+            self._db.execute(sql, params)
+            self._db.commit()
+
+
+def count_unfinished(folder):
+    """Number of resumable jobs in folder, without creating a job database there"""
+    if not os.path.exists(os.path.join(folder, JOBS_FILENAME)):
+        return 0
+    try:
+        store = JobStore(folder)
+    except sqlite3.Error:
+        return 0
+    try:
+        return len(store.unfinished())
+    finally:
+        store.close()
@@ -0,0 +1,95 @@
+"""Bounded in-memory status log with the full history spilled to rotating files"""
+import logging
+import os
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from downloader_cache import default_cache_dir
+
+LOG_FILENAME = "status.log"
+MAX_VIEW_LINES = 1000  # Lines kept in memory (and in the status widget)
+LOG_FILE_BYTES = 2 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+# Filter choices, from most to least verbose
+LEVELS = ("all", "warning", "error")
+LEVEL_RANK = {"info": 0, "warning": 1, "error": 2}
+
+
+def message_level(message):
+    """Classify a status message as info, warning or error from its marker"""
+    if message.startswith("❌") or "ERROR" in message:
+        return "error"
+    if message.startswith("⚠️") or "WARNING" in message:
+        return "warning"
+    return "info"
+
+
+def level_matches(level, minimum):
+    """True when a line of the given level passes the filter minimum ('all', 'warning' or 'error')"""
+    if minimum == "all":
+        return True
+    return LEVEL_RANK[level] >= LEVEL_RANK[minimum]
+
+
+class StatusLog:
+    """Ring buffer of recent status lines; every line is also written to a rotating log file"""
+    def __init__(self, path=None, max_lines=MAX_VIEW_LINES):
+        self.path = path or os.path.join(default_cache_dir(), "logs", LOG_FILENAME)
+        self.lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(f"{__name__}.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            handler = RotatingFileHandler(self.path, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS,
+                                          encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+        except OSError:
+            # The in-memory view still works without a writable log folder
+            self._logger.addHandler(logging.NullHandler())
+    
+    def append(self, entries):
+        """Add (level, line) pairs; the oldest lines fall out of memory but stay on disk"""
+        with self._lock:
+            self.lines.extend(entries)
+        for level, line in entries:
+            self._logger.log(logging.ERROR if level == "error" else logging.INFO, line)
+    
+    def clear(self):
+        """Forget the in-memory lines (the log files keep them)"""
+        with self._lock:
+            self.lines.clear()
+    
+    def recent(self, minimum="all", text=""):
+        """Recent lines passing the level filter and containing text (case-insensitive)"""
+        text = text.lower()
+        with self._lock:
+            entries = list(self.lines)
+        return [line for level, line in entries
+                if level_matches(level, minimum) and (not text or text in line.lower())]
+    
+    def search_history(self, text, minimum="all", limit=MAX_VIEW_LINES):
+        """Scan the log files, oldest first, and return the last limit matching lines"""
+        text = text.lower()
+        matches = deque(maxlen=limit)
+        paths = [f"{self.path}.{n}" for n in range(LOG_FILE_BACKUPS, 0, -1)] + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    line = line.rstrip("\n")
+                    if text and text not in line.lower():
+                        continue
+                    if level_matches(message_level(line.split("] ", 1)[-1]), minimum):
+                        matches.append(line)
+        return list(matches)
+    
+    def close(self):
+        for handler in list(self._logger.handlers):
+            handler.close()
+            self._logger.removeHandler(handler)
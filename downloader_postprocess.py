@@ -0,0 +1,63 @@
+"""CPU-bound post-processing (MP3 encoding) on a process pool"""
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from downloader_tools import find_tool
+
+
+def find_ffmpeg():
+    """Path of the ffmpeg executable, or None"""
+    found = find_tool('ffmpeg')
+    return found[0] if found else None
+
+
+def _run_ffmpeg(args, target, sources):
+    """Run ffmpeg into a temporary file, then move it into place and delete the sources"""
+    started = time.monotonic()
+    temp_target = f"{os.path.splitext(target)[0]}.temp{os.path.splitext(target)[1]}"
+    cmd = ['ffmpeg', '-y', '-loglevel', 'error', '-nostdin'] + args + [temp_target]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        if os.path.exists(temp_target):
+            os.remove(temp_target)
+        raise RuntimeError(result.stderr.strip() or f"ffmpeg exited with code {result.returncode}")
+    os.replace(temp_target, target)
+    for source in sources:
+        if source != target and os.path.exists(source):
+            os.remove(source)
+    return target, time.monotonic() - started
+
+
+def transcode_to_mp3(source, target):
+    """Encode the audio of source as VBR MP3 (best quality, like --audio-quality 0)"""
+    return _run_ffmpeg(['-i', source, '-vn', '-codec:a', 'libmp3lame', '-q:a', '0'], target, [source])
+
+
+# Merging planned video + audio streams stays inside yt-dlp: it is a stream copy, bound by disk rather than CPU
+TASKS = {
+    'mp3': transcode_to_mp3,
+}
+
+
+class PostProcessPool:
+    """Runs post-processing in worker processes so download workers keep the network busy"""
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+    
+    @property
+    def available(self):
+        return find_ffmpeg() is not None
+    
+    def submit(self, task, *args):
+        """Queue a task ('mp3'); the future resolves to (output path, seconds)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor.submit(TASKS[task], *args)
+    
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
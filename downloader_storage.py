@@ -0,0 +1,111 @@
+"""Free-space checks for admitting jobs, and the staging folder's background mover"""
+import errno
+import os
+import queue
+import shutil
+import threading
+import time
+
+DEFAULT_MIN_FREE = 1024 ** 3  # Free space every disk we write to keeps in reserve
+ADMISSION_POLL = 2.0  # Seconds between free-space checks while a job is held back
+
+
+def free_bytes(path):
+    """Free space on the disk holding path (its nearest existing parent), or None when unknown"""
+    while path and not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    try:
+        return shutil.disk_usage(path or '.').free
+    except OSError:
+        return None
+
+
+def same_disk(first, second):
+    try:
+        return os.stat(first).st_dev == os.stat(second).st_dev
+    except OSError:
+        return False
+
+
+def is_within(path, folder):
+    try:
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(folder)]) == os.path.abspath(folder)
+    except ValueError:
+        return False  # Different drives on Windows
+
+
+def move_atomic(source, destination):
+    """Move source so destination only ever holds the complete file (copied under a temporary name across disks)"""
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+    try:
+        os.replace(source, destination)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    temp_path = f"{destination}.moving"
+    try:
+        shutil.copyfile(source, temp_path)
+        shutil.copystat(source, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.remove(source)
+
+
+class StagingMover:
+    """Moves finished files from fast staging storage to their destination on a background thread"""
+    def __init__(self, on_moved=None, on_error=None):
+        self.on_moved = on_moved or (lambda job, path, seconds: None)
+        self.on_error = on_error or (lambda job, error: None)
+        self.pending_bytes = 0  # Staged bytes not yet at their destination
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def submit(self, job, source, destination):
+        size = os.path.getsize(source) if os.path.exists(source) else 0
+        with self._lock:
+            self.pending_bytes += size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="staging-mover", daemon=True)
+                self._thread.start()
+        self._queue.put((job, source, destination, size))
+    
+    @property
+    def busy(self):
+        return self._queue.unfinished_tasks > 0
+    
+    def join(self):
+        """Wait until every submitted file has been moved"""
+        self._queue.join()
+    
+    def close(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            job, source, destination, size = item
+            started = time.monotonic()
+            try:
+                move_atomic(source, destination)
+                self.on_moved(job, destination, time.monotonic() - started)
+            except OSError as e:
+                self.on_error(job, e)
+            finally:
+                with self._lock:
+                    self.pending_bytes -= size
+                self._queue.task_done()
@@ -0,0 +1,184 @@
+"""Per-folder high-water marks for incremental playlist syncs"""
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from downloader_cache import cache_key_for_url
+
+SYNC_FILENAME = ".ytdl-sync.json"
+
+# Consecutive known entries that end a newest-first listing (a few, so one re-added video doesn't stop it)
+KNOWN_RUN = 3
+# Entries re-listed before the end of an append-order playlist to check it still lines up
+OVERLAP = 3
+
+CHANNEL_PATH_RE = re.compile(r'^/(@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)(/(videos|shorts|streams))?/?$')
+
+
+def playlist_key(url):
+    return cache_key_for_url(url) or url.split('#')[0].rstrip('/')
+
+
+def newest_first(url):
+    """Channel upload lists put new videos first; ordinary playlists append them at the end"""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return False
+    list_id = parse_qs(parsed.query).get('list', [''])[0]
+    return list_id.startswith('UU') or bool(CHANNEL_PATH_RE.match(parsed.path))
+
+
+def upload_date(entry):
+    """YYYYMMDD of an entry's upload, when the listing reports one"""
+    if entry.get('upload_date'):
+        return str(entry['upload_date'])
+    timestamp = entry.get('timestamp') or entry.get('release_timestamp')
+    if timestamp:
+        return time.strftime('%Y%m%d', time.gmtime(timestamp))
+    return None
+
+
+class PlaylistMark:
+    """What a playlist looked like after its last sync"""
+    def __init__(self, seen=(), count=0, latest_upload=None, synced=None):
+        self.seen = set(seen)
+        self.count = count  # Position the playlist has been synced up to
+        self.latest_upload = latest_upload
+        self.synced = synced
+    
+    @property
+    def empty(self):
+        return not self.seen
+    
+    def to_dict(self):
+        return {'seen': sorted(self.seen), 'count': self.count, 'latest_upload': self.latest_upload,
+                'synced': self.synced}
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('seen', ()), data.get('count', 0), data.get('latest_upload'), data.get('synced'))
+
+
+class PlaylistScan:
+    """Decides, entry by entry, which listed videos a sync still has to download"""
+    def __init__(self, mark, newest, full=False):
+        self.mark = mark
+        self.newest = newest
+        if full or newest or mark.empty:
+            self.start = 1
+        else:
+            self.start = max(1, mark.count - OVERLAP + 1)
+        self.aligned = self.start == 1  # A late start must meet a known entry before trusting the listing
+        self.misaligned = False
+        self.complete = False  # Set by the caller when the listing ran to its end
+        self.reached_mark = False
+        self.held = []
+        self.listed = 0
+        self.known_run = 0
+        self.new = 0
+        self.positions = {}  # Video ID -> position in the playlist
+        self.offered = set()  # IDs handed out for download
+        self.last_index = 0
+        self.latest_upload = mark.latest_upload
+    
+    def feed(self, entry):
+        """Entries to download now (possibly none), or None once the listing can stop"""
+        self.listed += 1
+        video_id = entry.get('id')
+        position = entry.get('playlist_index') or self.start + self.listed - 1
+        self.last_index = max(self.last_index, position)
+        date = upload_date(entry)
+        if date and (self.latest_upload is None or date > self.latest_upload):
+            self.latest_upload = date
+        known = video_id in self.mark.seen
+        if video_id:
+            self.positions[video_id] = position
+        
+        if not self.aligned:
+            if known:
+                self.aligned = True
+                held, self.held = self.held, []
+                self.new += len(held)
+                return self._offer(held)
+            self.held.append(entry)
+            if len(self.held) >= OVERLAP:
+                self.misaligned = True
+                return None
+            return []
+        
+        if known:
+            self.known_run += 1
+            if self.newest and not self.mark.empty and self.known_run >= KNOWN_RUN:
+                self.reached_mark = True
+                return None
+            return []
+        self.known_run = 0
+        if self.newest and date and self.mark.latest_upload and date < self.mark.latest_upload:
+            # Older than the mark yet unseen: the known entries that should have stopped us were deleted
+            self.reached_mark = True
+            return None
+        self.new += 1
+        return self._offer([entry])
+    
+    def _offer(self, entries):
+        self.offered.update(entry.get('id') for entry in entries if entry.get('id'))
+        return entries
+    
+    def finish(self):
+        """Call after the listing ended; True when it never lined up and must be redone in full"""
+        if not self.aligned and self.complete:
+            self.misaligned = True
+        return self.misaligned
+    
+    def result(self, finished=()):
+        """The playlist's new high-water mark, advanced only past the offered entries in finished"""
+        count = self.last_index if self.complete and self.start == 1 else max(self.mark.count, self.last_index)
+        latest_upload = self.latest_upload
+        # Held, failed and stopped entries were never downloaded, so the next sync must offer them again
+        unfinished = self.offered - set(finished)
+        if unfinished:
+            count = min(count, min(self.positions[video_id] for video_id in unfinished) - 1)
+            latest_upload = self.mark.latest_upload
+        return PlaylistMark(self.mark.seen | (self.offered - unfinished), count, latest_upload, time.time())
+
+
+class SyncState:
+    """Playlist key -> PlaylistMark for one download folder"""
+    def __init__(self, folder):
+        self.path = os.path.join(folder, SYNC_FILENAME)
+        self._marks = None
+        self._lock = threading.Lock()
+    
+    def mark(self, key):
+        with self._lock:
+            self._load()
+            return PlaylistMark.from_dict(self._marks.get(key, {}))
+    
+    def update(self, key, mark):
+        """Store a playlist's mark and persist the file atomically"""
+        with self._lock:
+            self._load()
+            self._marks[key] = mark.to_dict()
+            self._save()
+    
+    def _load(self):
+        if self._marks is not None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._marks = json.load(f).get('playlists', {})
+        except (OSError, ValueError, AttributeError):
+            self._marks = {}
+    
+    def _save(self):
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'playlists': self._marks}, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # The next sync lists a little more of the playlist
@@ -0,0 +1,161 @@
+"""Per-job phase timings and throughput, exported as JSON lines and a Prometheus text file"""
+import json
+import os
+import threading
+import time
+
+from downloader_cache import default_cache_dir
+
+JSONL_FILENAME = "downloads.jsonl"
+PROM_FILENAME = "ytdl_downloader.prom"  # node_exporter's textfile collector reads *.prom
+
+# Phases in the order a job goes through them; run-level phases are shared by all jobs of a run
+RUN_PHASES = ("dependency_check", "metadata")
+JOB_PHASES = ("queue_wait", "download", "postprocess", "finalize")
+
+
+def default_telemetry_dir():
+    return os.path.join(default_cache_dir(), "telemetry")
+
+
+class Telemetry:
+    """Collects one record per finished job and keeps cumulative counters for scraping"""
+    def __init__(self, folder=None):
+        self.folder = folder or default_telemetry_dir()
+        self.jsonl_path = os.path.join(self.folder, JSONL_FILENAME)
+        self.prom_path = os.path.join(self.folder, PROM_FILENAME)
+        self.run_id = None
+        self.backend_name = None
+        self.run_phases = {}
+        self._run_started = None
+        self._lock = threading.Lock()
+        
+        # Cumulative since this process started; Prometheus treats a restart as a counter reset
+        self.jobs = {}  # status -> count
+        self.phase_seconds = {phase: 0.0 for phase in RUN_PHASES + JOB_PHASES}
+        self.phase_count = {phase: 0 for phase in RUN_PHASES + JOB_PHASES}
+        self.bytes_total = 0
+        self.retries_total = 0
+        self.peak_speed = 0.0
+        self.last_run = {}
+    
+    def start_run(self, backend_name):
+        """Begin a new run; phases recorded before this (e.g. the dependency check) are kept for it"""
+        with self._lock:
+            self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+            self._run_started = time.monotonic()
+            self.backend_name = backend_name
+    
+    def record_phase(self, phase, seconds):
+        """Add time spent in a run-level phase"""
+        with self._lock:
+            self.run_phases[phase] = self.run_phases.get(phase, 0.0) + seconds
+            self.phase_seconds[phase] += seconds
+            self.phase_count[phase] += 1
+    
+    def record_job(self, job, status):
+        """Append the job's record to the JSON lines file and update the counters"""
+        elapsed = job.timings.get('download') or 0.0
+        record = {
+            'type': 'job',
+            'run_id': self.run_id,
+            'time': time.time(),
+            'video_id': job.video_id,
+            'title': job.title,
+            'status': status,
+            'backend': self.backend_name,
+            'format': job.format_selector(),
+            'fragments': job.fragments,
+            'phases': {phase: round(job.timings[phase], 3) for phase in JOB_PHASES if phase in job.timings},
+            'bytes': job.downloaded_bytes,
+            'avg_speed': round(job.downloaded_bytes / elapsed, 1) if elapsed else None,
+            'peak_speed': job.peak_speed,
+            'attempts': job.attempts,
+            'retries': max(0, job.attempts - 1),
+        }
+        with self._lock:
+            self.jobs[status] = self.jobs.get(status, 0) + 1
+            for phase, seconds in record['phases'].items():
+                self.phase_seconds[phase] += seconds
+                self.phase_count[phase] += 1
+            self.bytes_total += job.downloaded_bytes
+            self.retries_total += record['retries']
+            self.peak_speed = max(self.peak_speed, job.peak_speed or 0.0)
+            self._append(record)
+    
+    def finish_run(self, summary):
+        """Write the run record and refresh the Prometheus file"""
+        with self._lock:
+            duration = time.monotonic() - self._run_started if self._run_started else 0.0
+            record = {
+                'type': 'run',
+                'run_id': self.run_id,
+                'time': time.time(),
+                'backend': self.backend_name,
+                'duration': round(duration, 3),
+                'phases': {phase: round(seconds, 3) for phase, seconds in self.run_phases.items()},
+                'total': summary.total,
+                'completed': summary.completed,
+                'failed': summary.failed,
+                'skipped': summary.skipped,
+                'cancelled': summary.cancelled,
+                'stopped': summary.stopped,
+            }
+            self.last_run = record
+            self.run_phases = {}
+            self._append(record)
+            self._write_prometheus()
+    
+    def refresh(self):
+        """Rewrite the Prometheus file from the current counters, for processes that run for days"""
+        with self._lock:
+            self._write_prometheus()
+    
+    def _append(self, record):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError:
+            pass  # Telemetry must never fail a download
+    
+    def _write_prometheus(self):
+        lines = [
+            "# HELP ytdl_jobs_total Download jobs finished, by outcome.",
+            "# TYPE ytdl_jobs_total counter",
+        ]
+        for status, count in sorted(self.jobs.items()):
+            lines.append(f'ytdl_jobs_total{{status="{status}"}} {count}')
+        lines += [
+            "# HELP ytdl_phase_seconds Time spent per phase.",
+            "# TYPE ytdl_phase_seconds summary",
+        ]
+        for phase in RUN_PHASES + JOB_PHASES:
+            lines.append(f'ytdl_phase_seconds_sum{{phase="{phase}"}} {self.phase_seconds[phase]:.3f}')
+            lines.append(f'ytdl_phase_seconds_count{{phase="{phase}"}} {self.phase_count[phase]}')
+        lines += [
+            "# HELP ytdl_downloaded_bytes_total Bytes downloaded by finished jobs.",
+            "# TYPE ytdl_downloaded_bytes_total counter",
+            f"ytdl_downloaded_bytes_total {self.bytes_total}",
+            "# HELP ytdl_retries_total Job attempts beyond the first.",
+            "# TYPE ytdl_retries_total counter",
+            f"ytdl_retries_total {self.retries_total}",
+            "# HELP ytdl_peak_speed_bytes Highest speed seen for a single job, in bytes per second.",
+            "# TYPE ytdl_peak_speed_bytes gauge",
+            f"ytdl_peak_speed_bytes {self.peak_speed:.1f}",
+            "# HELP ytdl_last_run_duration_seconds Wall time of the last run.",
+            "# TYPE ytdl_last_run_duration_seconds gauge",
+            f"ytdl_last_run_duration_seconds {self.last_run.get('duration', 0)}",
+            "# HELP ytdl_last_run_timestamp_seconds When the last run finished.",
+            "# TYPE ytdl_last_run_timestamp_seconds gauge",
+            f"ytdl_last_run_timestamp_seconds {self.last_run.get('time', 0):.0f}",
+        ]
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            # Written atomically so the collector never scrapes a half-written file
+            temp_path = f"{self.prom_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(temp_path, self.prom_path)
+        except OSError:
+            pass
@@ -0,0 +1,96 @@
+"""Cached discovery of yt-dlp and ffmpeg: path and version, re-read only when the executable changes"""
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+from downloader_cache import default_cache_dir
+
+TOOLS_FILENAME = "tools.json"
+VERSION_ARGS = {'yt-dlp': ['--version'], 'ffmpeg': ['-version']}
+VERSION_TIMEOUT = 15  # Seconds; a first run of a frozen yt-dlp binary unpacks itself
+
+
+def module_available(name):
+    """True when a Python package can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def parse_version(name, output):
+    lines = output.strip().splitlines()
+    if not lines:
+        return None
+    if name == 'ffmpeg':
+        # "ffmpeg version 6.1.1-3ubuntu5 Copyright (c) 2000-2023 ..."
+        parts = lines[0].split()
+        return parts[2] if len(parts) > 2 and parts[1] == 'version' else lines[0]
+    return lines[0]
+
+
+class ToolCache:
+    """Tool name -> path, version and the executable's mtime and size; a lookup costs a stat, not a process"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(default_cache_dir(), TOOLS_FILENAME)
+        self._records = None
+        self._lock = threading.Lock()
+    
+    def find(self, name):
+        """(path, version) of the tool on the PATH, or None when it is missing or doesn't run"""
+        path = shutil.which(name)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)  # Follows symlinks, so an upgraded binary behind the same link is noticed
+        except OSError:
+            return None
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        with self._lock:
+            self._load()
+            record = self._records.get(name)
+            if record and record['path'] == path and record['stamp'] == stamp:
+                return path, record['version']
+        
+        try:
+            result = subprocess.run([path] + VERSION_ARGS.get(name, ['--version']), capture_output=True, text=True,
+                                    timeout=VERSION_TIMEOUT, check=True)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        version = parse_version(name, result.stdout)
+        if version is None:
+            return None
+        with self._lock:
+            self._records[name] = {'path': path, 'stamp': stamp, 'version': version}
+            self._save()
+        return path, version
+    
+    def _load(self):
+        if self._records is not None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._records = json.load(f).get('tools', {})
+        except (OSError, ValueError, AttributeError):
+            self._records = {}
+    
+    def _save(self):
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'tools': self._records}, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # The version is read again next time
+
+
+_tool_cache = ToolCache()
+
+
+def find_tool(name):
+    """(path, version) of an external tool, from the shared on-disk cache when the executable is unchanged"""
+    return _tool_cache.find(name)
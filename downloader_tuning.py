@@ -0,0 +1,73 @@
+"""Adaptive concurrent-fragment tuning and external multi-connection downloaders"""
+import shutil
+import threading
+
+# Total connections all parallel jobs may open together
+DEFAULT_MAX_CONNECTIONS = 16
+
+# Weight of the newest measurement in the per-level throughput average
+SMOOTHING = 0.5
+
+# A level must beat its neighbour by this factor before the tuner moves to it
+MIN_GAIN = 1.1
+
+EXTERNAL_DOWNLOADERS = ("aria2c",)
+
+
+def find_external_downloader(name):
+    """Path of an external downloader if it is installed, else None"""
+    if name not in EXTERNAL_DOWNLOADERS:
+        return None
+    return shutil.which(name)
+
+
+def external_downloader_args(name, connections):
+    """Arguments that make the external downloader split a file over several connections"""
+    if name == "aria2c":
+        return ['-x', str(connections), '-s', str(connections), '-k', '1M']
+    return []
+
+
+class FragmentTuner:
+    """Hill-climbs the concurrent fragment count per job from measured throughput"""
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, workers=1):
+        self.max_connections = max_connections
+        self.workers = workers
+        self.level = 1
+        self._throughput = {}  # level -> smoothed bytes per second
+        self._lock = threading.Lock()
+    
+    @property
+    def budget(self):
+        """Most fragments one job may use so all workers together stay within max_connections"""
+        return max(1, self.max_connections // max(1, self.workers))
+    
+    def choose(self):
+        """Fragment count for the next job"""
+        with self._lock:
+            self.level = min(self.level, self.budget)
+            up = self.level + 1
+            # Explore one step up until that level has been measured
+            if up <= self.budget and up not in self._throughput and self.level in self._throughput:
+                return up
+            candidates = [level for level in (self.level - 1, self.level, up)
+                          if 1 <= level <= self.budget and level in self._throughput]
+            if not candidates:
+                return self.level
+            best = max(candidates, key=lambda level: self._throughput[level])
+            current = self._throughput.get(self.level, 0)
+            if best != self.level and self._throughput[best] >= current * MIN_GAIN:
+                self.level = best
+            return self.level
+    
+    def record(self, level, downloaded_bytes, seconds):
+        """Feed back a finished job's average throughput at the fragment count it used"""
+        if not downloaded_bytes or seconds <= 0:
+            return
+        speed = downloaded_bytes / seconds
+        with self._lock:
+            previous = self._throughput.get(level)
+            self._throughput[level] = speed if previous is None else previous + SMOOTHING * (speed - previous)
+            # Only adopt a higher level when it measured clearly faster
+            if level > self.level and self._throughput[level] >= self._throughput.get(self.level, 0) * MIN_GAIN:
+                self.level = level